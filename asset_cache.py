@@ -0,0 +1,316 @@
+"""
+Preprocessed asset cache for Lissana Gaha Nagima.
+
+Decoding the PNGs, scaling them and decoding the WAVs is the bulk of startup
+time. The build step here does that once and packs the results into a single
+file: images as pre-scaled pixel buffers in the display's byte order and
+sounds as PCM in the mixer's format. Loading maps that file into memory and
+builds Surfaces directly on top of the mapping.
+
+Each entry records the source file's mtime, size and SHA-256 along with the
+target size and formats, and the cache is rebuilt when any of them change.
+
+Run this file to build the cache ahead of time, on the machine that runs the
+game so the images match its display's pixel format:
+
+    python asset_cache.py
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+import pygame
+
+from pole_sim import SCREEN_WIDTH, SCREEN_HEIGHT, POLE_WIDTH, CLIMBER_WIDTH, CLIMBER_HEIGHT, COCONUT_SIZE
+
+CACHE_MAGIC = b'LGASSET1'
+CACHE_VERSION = 1
+CACHE_FILENAME = 'asset_cache.bin'
+ALIGNMENT = 64
+
+# name: (source file, target size)
+IMAGES = {
+    'background': ('background.png', (SCREEN_WIDTH, SCREEN_HEIGHT)),
+    'pole': ('pole.png', (POLE_WIDTH, SCREEN_HEIGHT)),
+    'climber': ('climber.png', (CLIMBER_WIDTH, CLIMBER_HEIGHT)),
+    'coconut': ('coconut.png', (COCONUT_SIZE, COCONUT_SIZE)),
+}
+
+# Mixer settings the game starts the mixer with; sounds are cached in this format
+MIXER_FREQUENCY = 44100
+MIXER_SIZE = -16
+MIXER_CHANNELS = 2
+MIXER_BUFFER = 512
+MIXER_FORMAT = (MIXER_FREQUENCY, MIXER_SIZE, MIXER_CHANNELS)  # as returned by mixer.get_init()
+
+# name: source file
+SOUNDS = {
+    'fall': 'fall.wav',
+    'win': 'win.wav',
+}
+
+
+def display_pixel_format(surface):
+    """Byte order string for pygame.image.tobytes/frombuffer matching surface"""
+    if surface.get_bitsize() == 32 and surface.get_masks()[:3] == (0xFF0000, 0xFF00, 0xFF):
+        return 'BGRA' if sys.byteorder == 'little' else 'ARGB'
+    return 'RGBA'
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _source_info(path):
+    stat = os.stat(path)
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def _parse_header(start, rest):
+    """
+    Decode the cache header
+
+    start holds the magic and length field; rest is the remainder of the
+    file, either as a buffer or as an open file positioned after start.
+    """
+    if bytes(start[:len(CACHE_MAGIC)]) != CACHE_MAGIC:
+        return None
+    (length,) = struct.unpack('<I', start[len(CACHE_MAGIC):])
+    encoded = rest.read(length) if hasattr(rest, 'read') else rest[:length]
+    header = json.loads(bytes(encoded))
+    prefix = len(CACHE_MAGIC) + 4 + length
+    header['data_start'] = prefix + (-prefix % ALIGNMENT)
+    return header
+
+
+def _header_prefix(settings, entries):
+    """Magic, length and header, padded to where the data section starts"""
+    # Entry offsets are relative to the aligned data section after the header
+    header = json.dumps({'settings': settings, 'entries': entries}).encode()
+    prefix = CACHE_MAGIC + struct.pack('<I', len(header)) + header
+    return prefix + bytes(-len(prefix) % ALIGNMENT)
+
+
+class AssetCache:
+    """Builds and loads the packed cache file for one assets directory"""
+
+    def __init__(self, assets_dir, cache_path=None, pixel_format='BGRA', mixer_format=None):
+        self.assets_dir = assets_dir
+        self.cache_path = cache_path or os.path.join(assets_dir, CACHE_FILENAME)
+        self.pixel_format = pixel_format
+        self.mixer_format = list(mixer_format) if mixer_format else None
+        self.mapping = None
+        self.header = None
+        self.data = None
+
+    def _settings(self):
+        return {
+            'version': CACHE_VERSION,
+            'pixel_format': self.pixel_format,
+            'mixer_format': self.mixer_format,
+        }
+
+    def read_header(self):
+        """Return the cache header, or None if the file is missing or unreadable"""
+        try:
+            with open(self.cache_path, 'rb') as f:
+                return _parse_header(f.read(len(CACHE_MAGIC) + 4), f)
+        except (OSError, ValueError, struct.error):
+            return None
+
+    def is_current(self, header, sounds=True):
+        """
+        Check that the header was built from the current sources and settings
+
+        With sounds=False only the images are checked, whatever mixer format
+        the sounds were packed in.
+        """
+        if header is None:
+            return False
+        settings = self._settings()
+        built = dict(header.get('settings') or {})
+        if not sounds:
+            settings.pop('mixer_format')
+            built.pop('mixer_format', None)
+        if built != settings:
+            return False
+        entries = header['entries']
+        wanted = {name: source for name, (source, size) in IMAGES.items()}
+        if sounds and self.mixer_format:
+            wanted.update(SOUNDS)
+        touched = False
+        for name, source in wanted.items():
+            path = os.path.join(self.assets_dir, source)
+            entry = entries.get(name)
+            if not os.path.exists(path):
+                if entry is not None:
+                    return False
+                continue
+            if entry is None:
+                return False
+            if name in IMAGES and entry['size'] != list(IMAGES[name][1]):
+                return False
+            info = _source_info(path)
+            if info != entry['source']:
+                # Touched but possibly unchanged, e.g. after a fresh checkout
+                if _file_hash(path) != entry['sha256']:
+                    return False
+                entry['source'] = info
+                touched = True
+        if touched:
+            # Record the new mtimes so the next check needn't hash again
+            self._rewrite_header(header)
+        return True
+
+    def _rewrite_header(self, header):
+        """Replace the cache file's header with header, keeping its packed data"""
+        try:
+            with open(self.cache_path, 'rb') as f:
+                f.seek(header['data_start'])
+                data = f.read()
+            temp_path = self.cache_path + '.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(_header_prefix(header['settings'], header['entries']))
+                f.write(data)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            print(f"Could not update asset cache header: {e}")
+
+    def pack(self):
+        """Decode, scale and convert every asset and return the cache file contents"""
+        entries = {}
+        blobs = []
+        offset = 0
+
+        def add(name, entry, data):
+            nonlocal offset
+            entry['offset'] = offset
+            entry['length'] = len(data)
+            entries[name] = entry
+            blobs.append(data)
+            offset += len(data)
+            padding = -offset % ALIGNMENT
+            if padding:
+                blobs.append(bytes(padding))
+                offset += padding
+
+        for name, (source, size) in IMAGES.items():
+            path = os.path.join(self.assets_dir, source)
+            if not os.path.exists(path):
+                print(f"Could not load {name} image: {source} not found")
+                continue
+            try:
+                image = pygame.transform.scale(pygame.image.load(path), size)
+                data = pygame.image.tobytes(image, self.pixel_format)
+            except Exception as e:
+                print(f"Could not load {name} image: {e}")
+                continue
+            entry = {'kind': 'image', 'size': list(size), 'source': _source_info(path),
+                     'sha256': _file_hash(path)}
+            add(name, entry, data)
+
+        if self.mixer_format:
+            for name, source in SOUNDS.items():
+                path = os.path.join(self.assets_dir, source)
+                if not os.path.exists(path):
+                    continue
+                try:
+                    data = pygame.mixer.Sound(path).get_raw()
+                except Exception as e:
+                    print(f"Error loading {source}: {e}")
+                    continue
+                entry = {'kind': 'sound', 'source': _source_info(path), 'sha256': _file_hash(path)}
+                add(name, entry, data)
+
+        return _header_prefix(self._settings(), entries) + b''.join(blobs)
+
+    def build(self):
+        """Pack every asset and write the cache file, returning its contents"""
+        contents = self.pack()
+        temp_path = self.cache_path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            f.write(contents)
+        os.replace(temp_path, self.cache_path)
+        return contents
+
+    def load(self, sounds=True, checked=False):
+        """
+        Return (images, sounds) dicts built from the cache file
+
+        The cache is rebuilt first if it is missing or out of date. Images are
+        Surfaces that share memory with the mapped file; assets that could not
+        be loaded are left out. With sounds=False the sounds dict is empty and
+        load_sounds() makes them later, so images can be shown before the
+        mixer is started; only the images need to be current then. With
+        checked=True the caller has just found the cache current with
+        is_current(), and the file is mapped without checking it again.
+        """
+        if checked or self.is_current(self.read_header(), sounds=sounds):
+            with open(self.cache_path, 'rb') as f:
+                self.mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            print("Building asset cache")
+            try:
+                self.mapping = self.build()
+            except OSError as e:
+                # Read-only install: use the packed assets without saving them
+                print(f"Could not write asset cache: {e}")
+                self.mapping = self.pack()
+
+        view = memoryview(self.mapping)
+        self.header = _parse_header(view[:len(CACHE_MAGIC) + 4], view[len(CACHE_MAGIC) + 4:])
+        self.data = view[self.header['data_start']:]
+        return self._entries('image'), self.load_sounds() if sounds else {}
+
+    def load_sounds(self):
+        """Return the sounds dict from the cache file mapped by load(); needs the mixer"""
+        return self._entries('sound')
+
+    def _entries(self, kind):
+        loaded = {}
+        for name, entry in self.header['entries'].items():
+            if entry['kind'] != kind:
+                continue
+            buffer = self.data[entry['offset']:entry['offset'] + entry['length']]
+            if kind == 'image':
+                loaded[name] = pygame.image.frombuffer(buffer, tuple(entry['size']), self.pixel_format)
+            else:
+                loaded[name] = pygame.mixer.Sound(buffer=buffer)
+        return loaded
+
+
+def main():
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+    # Open the display the game will use, so the images are packed in its
+    # pixel format; without one, fall back to the dummy driver's
+    try:
+        pygame.display.init()
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    except pygame.error as e:
+        print(f"No display ({e}); building for the dummy video driver's pixel format")
+        pygame.display.quit()
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+        pygame.display.init()
+        screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.mixer.init(frequency=MIXER_FREQUENCY, size=MIXER_SIZE, channels=MIXER_CHANNELS,
+                      buffer=MIXER_BUFFER)
+    assets_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+    cache = AssetCache(assets_dir, pixel_format=display_pixel_format(screen),
+                       mixer_format=pygame.mixer.get_init())
+    start = time.perf_counter()
+    contents = cache.build()
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {len(contents)} bytes to {cache.cache_path} in {elapsed:.2f}s")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Headless frame-time benchmark for Lissana Gaha Nagima.
+
+Runs Game under SDL's dummy video and audio drivers for a fixed number of
+frames per scenario, without clock.tick, timing handle_events, update, the
+sound flush and draw separately. Results are printed (or written) as JSON so
+runs from different commits can be compared:
+
+    python benchmark.py --output before.json
+    python benchmark.py --compare before.json
+
+--pole-screens N runs the same scenarios on a pole N screens tall, where the
+view scrolls with the climber; frame times should match the one-screen run.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+
+import numpy as np
+import pygame
+
+from pole_sim import SCREEN_WIDTH, SCREEN_HEIGHT, CLIMBER_HEIGHT, KEY_UP, BALANCE_KEY_BITS
+from profiler import GCMonitor
+
+# Keep the game's startup chatter off stdout, which carries the JSON results
+with contextlib.redirect_stdout(sys.stderr):
+    from slippery_pole_game import Game
+
+PHASES = ('handle_events', 'update', 'sound', 'draw')
+BALANCE_EVENT_KEYS = {'A': pygame.K_a, 'D': pygame.K_d}
+
+
+class Scenario:
+    """Scripted input and state for a benchmark run"""
+
+    name = None
+    held = KEY_UP
+
+    def __init__(self, seed=0):
+        self.rng = random.Random(seed)
+
+    def setup(self, game):
+        pass
+
+    def before_frame(self, game):
+        """Post input events and adjust state ahead of the timed phases"""
+        sim = game.sim
+        if sim.game_over or sim.win:
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_r))
+
+
+class IdleClimb(Scenario):
+    """Hold UP and balance as soon as a slip starts"""
+
+    name = 'idle_climb'
+
+    def before_frame(self, game):
+        super().before_frame(game)
+        sim = game.sim
+        if sim.is_slipping:
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=BALANCE_EVENT_KEYS[sim.balance_key_needed]))
+
+
+class ConstantSlipping(Scenario):
+    """Keep the climber slipping (and prompting) on every frame"""
+
+    name = 'constant_slipping'
+    held = 0
+
+    def before_frame(self, game):
+        sim = game.sim
+        if not sim.is_slipping:
+            sim.is_slipping = True
+            sim.balance_key_needed = self.rng.choice(list(BALANCE_KEY_BITS))
+        # Hold the climber near the bottom of the pole so slipping never ends the game
+        if sim.climber_y > sim.world_height - SCREEN_HEIGHT // 2:
+            sim.climber_y = sim.world_height - SCREEN_HEIGHT * 2 // 3
+        sim.game_over = False
+
+
+class CoconutStorm(Scenario):
+    """Keep a fixed number of coconuts alive on screen"""
+
+    def __init__(self, live, seed=0):
+        super().__init__(seed)
+        self.live = live
+        self.name = f'coconut_storm_{live}'
+
+    def setup(self, game):
+        coconuts = game.sim.coconuts
+        top = game.sim.window_top()
+        while len(coconuts) < self.live:
+            coconuts.spawn(self.rng.randint(0, SCREEN_WIDTH), top + self.rng.randint(0, SCREEN_HEIGHT))
+
+    def before_frame(self, game):
+        sim = game.sim
+        # Replace coconuts that fell off or hit the climber
+        top = sim.window_top()
+        while len(sim.coconuts) < self.live:
+            sim.coconuts.spawn(self.rng.randint(0, SCREEN_WIDTH), top)
+        # Knock-backs would end the game; put the climber back instead
+        if sim.game_over or sim.win:
+            sim.game_over = sim.win = False
+            sim.climber_y = sim.world_height - CLIMBER_HEIGHT - 100
+
+
+class ParticleStorm(Scenario):
+    """Keep a fixed number of particles alive by bursting more every frame"""
+
+    def __init__(self, live, seed=0):
+        super().__init__(seed)
+        self.live = live
+        self.name = f'particle_storm_{live}'
+
+    def before_frame(self, game):
+        super().before_frame(game)
+        top = game.sim.window_top()
+        while len(game.particles) < self.live:
+            game.particles.burst(self.rng.randint(0, SCREEN_WIDTH), top + self.rng.randint(0, SCREEN_HEIGHT),
+                                 20, 4, 30)
+
+
+def scenarios(seed=0):
+    return [
+        IdleClimb(seed),
+        ConstantSlipping(seed),
+        CoconutStorm(10, seed),
+        CoconutStorm(100, seed),
+        CoconutStorm(1000, seed),
+        ParticleStorm(1000, seed),
+    ]
+
+
+class BenchmarkGame(Game):
+    """Game whose held keys come from the scenario instead of the keyboard"""
+
+    held = 0
+
+    def held_keys(self):
+        return self.held
+
+
+def summarize(samples_ns):
+    samples_us = np.asarray(samples_ns, dtype=np.float64) / 1000.0
+    p50, p95, p99 = np.percentile(samples_us, [50, 95, 99])
+    return {
+        'mean_us': round(float(samples_us.mean()), 2),
+        'p50_us': round(float(p50), 2),
+        'p95_us': round(float(p95), 2),
+        'p99_us': round(float(p99), 2),
+        'max_us': round(float(samples_us.max()), 2),
+    }
+
+
+def run_scenario(game, scenario, frames, warmup):
+    game.sim.rng = random.Random(0)
+    game.reset_game()
+    game.held = scenario.held
+    scenario.setup(game)
+    sound_before = game.sounds.stats()
+
+    timings = {phase: np.zeros(frames, dtype=np.int64) for phase in PHASES}
+    totals = np.zeros(frames, dtype=np.int64)
+    clock = time.perf_counter_ns
+    gc_monitor = GCMonitor()
+    for frame in range(warmup + frames):
+        if frame == warmup:
+            # Pools have grown to their working size; from here on a loop
+            # without per-frame allocation leaves the block count flat
+            gc_monitor.reset()
+        scenario.before_frame(game)
+        t0 = clock()
+        game.handle_events()
+        t1 = clock()
+        game.update()
+        t2 = clock()
+        game.sounds.flush()
+        t3 = clock()
+        game.draw()
+        t4 = clock()
+        if frame >= warmup:
+            i = frame - warmup
+            timings['handle_events'][i] = t1 - t0
+            timings['update'][i] = t2 - t1
+            timings['sound'][i] = t3 - t2
+            timings['draw'][i] = t4 - t3
+            totals[i] = t4 - t0
+    gc_monitor.close()
+
+    return {
+        'frames': frames,
+        'fps': round(frames / (totals.sum() / 1e9), 1),
+        'frame': summarize(totals),
+        'phases': {phase: summarize(timings[phase]) for phase in PHASES},
+        'live_coconuts_at_end': len(game.sim.coconuts),
+        'live_particles_at_end': len(game.particles),
+        'gc': gc_monitor.stats(),
+        'sound': {key: value - sound_before[key] for key, value in game.sounds.stats().items()},
+    }
+
+
+def git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        return result.stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(before, after):
+    print(f"{'scenario':<24}{'before fps':>12}{'after fps':>12}{'change':>10}{'gc runs':>9}{'blocks':>8}")
+    for name, result in after['scenarios'].items():
+        old = before['scenarios'].get(name)
+        if old is None:
+            continue
+        change = result['fps'] / old['fps'] - 1.0
+        gc_stats = result['gc']
+        print(f"{name:<24}{old['fps']:>12.1f}{result['fps']:>12.1f}{change:>+10.1%}"
+              f"{sum(gc_stats['collections']):>9}{gc_stats['allocated_blocks']:>+8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless frame-time benchmark")
+    parser.add_argument('--frames', type=int, default=1000, help="timed frames per scenario")
+    parser.add_argument('--warmup', type=int, default=60, help="untimed frames before each scenario")
+    parser.add_argument('--scenario', action='append', help="run only the named scenario(s)")
+    parser.add_argument('--dirty-rects', action='store_true', help="benchmark the dirty-rect renderer")
+    parser.add_argument('--pole-screens', type=int, default=1, metavar='N',
+                        help="benchmark on a pole N screens tall")
+    parser.add_argument('--output', metavar='PATH', help="write JSON results to PATH instead of stdout")
+    parser.add_argument('--compare', metavar='PATH', help="print FPS changes against an earlier JSON result")
+    args = parser.parse_args()
+
+    with contextlib.redirect_stdout(sys.stderr):
+        game = BenchmarkGame(dirty_rects=args.dirty_rects, seed=0, pole_screens=args.pole_screens)
+    results = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'dirty_rects': args.dirty_rects,
+        'pole_screens': args.pole_screens,
+        'scenarios': {},
+    }
+    for scenario in scenarios():
+        if args.scenario and scenario.name not in args.scenario:
+            continue
+        results['scenarios'][scenario.name] = run_scenario(game, scenario, args.frames, args.warmup)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    elif not args.compare:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), results)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,113 +1,154 @@
-import numpy as np
+import argparse
+import json
 import wave
-import struct
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
 
-def create_sine_wave(frequency, duration_ms, volume=0.5, sample_rate=44100):
-    """
-    Create a sine wave with the given frequency and duration
-    
-    Args:
-        frequency: Frequency in Hz
-        duration_ms: Duration in milliseconds
-        volume: Volume between 0 and 1
-        sample_rate: Sample rate in Hz
-    
-    Returns:
-        Numpy array of audio samples
-    """
-    num_samples = int(duration_ms * sample_rate / 1000)
-    t = np.linspace(0, duration_ms / 1000, num_samples, endpoint=False)
-    wave_data = np.sin(2 * np.pi * frequency * t) * volume
-    return wave_data
+import synth
+
+# Records the parameter hash each output was rendered from
+MANIFEST_FILENAME = 'sound_manifest.json'
+
+# Specs for the synthesized sound effects (see synth.py for the format)
+CLIMB_SPEC = {
+    'duration_ms': 50,
+    'layers': [
+        {'type': 'sine', 'freq': 440, 'volume': 0.3},
+        {'type': 'sine', 'freq': 550, 'volume': 0.2},
+    ],
+    'envelope': {'type': 'linear', 'start': 0.5, 'end': 1.0},
+}
+
+# Downward sweep of overlapping 3 ms tones, one every millisecond
+SLIP_SPEC = {
+    'duration_ms': 300,
+    'layers': [
+        {'type': 'stepped_chirp', 'start_freq': 800, 'freq_step': -5, 'steps': 100,
+         'step_ms': 1, 'tone_ms': 3, 'volume': 0.4},
+    ],
+    'envelope': {'type': 'linear', 'start': 1.0, 'end': 0.1},
+}
 
-def create_climb_sound():
+# Thud with some noise
+HIT_SPEC = {
+    'duration_ms': 200,
+    'layers': [
+        {'type': 'sine', 'freq': 150, 'volume': 0.7},
+        {'type': 'sine', 'freq': 80, 'volume': 0.5},
+        {'type': 'noise', 'amount': 0.2, 'seed': 0},
+    ],
+    'envelope': {'type': 'exp', 'rate': 10},
+}
+
+def create_climb_sound(sample_rate=44100):
     """Create a short climbing sound effect"""
-    sample_rate = 44100
-    audio = create_sine_wave(440, 50, 0.3, sample_rate)
-    audio += create_sine_wave(550, 50, 0.2, sample_rate)
-    # Apply envelope
-    envelope = np.linspace(0.5, 1.0, len(audio))
-    audio = audio * envelope
-    return audio, sample_rate
-
-def create_slip_sound():
+    return synth.render(CLIMB_SPEC, sample_rate), sample_rate
+
+def create_slip_sound(sample_rate=44100):
     """Create a slipping sound effect"""
-    sample_rate = 44100
-    duration = 300
-    audio = np.zeros(int(duration * sample_rate / 1000))
-    
-    # Create a downward sweep
-    for i in range(100):
-        freq = 800 - i * 5
-        start = int(i * sample_rate / 1000)
-        end = int((i + 3) * sample_rate / 1000)
-        if end > len(audio):
-            end = len(audio)
-        t = np.linspace(0, 3/1000, end-start, endpoint=False)
-        audio[start:end] += np.sin(2 * np.pi * freq * t) * 0.4
-    
-    # Apply envelope
-    envelope = np.linspace(1.0, 0.1, len(audio))
-    audio = audio * envelope
-    return audio, sample_rate
+    return synth.render(SLIP_SPEC, sample_rate), sample_rate
 
-def create_hit_sound():
+def create_hit_sound(sample_rate=44100):
     """Create a coconut hit sound effect"""
-    sample_rate = 44100
-    duration = 200
-    audio = np.zeros(int(duration * sample_rate / 1000))
-    
-    # Create a thud sound
-    audio += create_sine_wave(150, duration, 0.7, sample_rate)
-    audio += create_sine_wave(80, duration, 0.5, sample_rate)
-    
-    # Add some noise
-    noise = np.random.uniform(-0.2, 0.2, len(audio))
-    audio = audio + noise
-    
-    # Apply envelope
-    envelope = np.exp(-np.linspace(0, 10, len(audio)))
-    audio = audio * envelope
-    return audio, sample_rate
+    return synth.render(HIT_SPEC, sample_rate), sample_rate
 
 def save_wave_file(filename, audio_data, sample_rate):
     """Save audio data to a WAV file"""
-    # Ensure the audio is normalized between -1 and 1
-    audio_data = np.clip(audio_data, -1, 1)
-    
-    # Convert to 16-bit PCM
-    audio_data = (audio_data * 32767).astype(np.int16)
-    
+    # Clip to between -1 and 1 and convert to 16-bit PCM
+    save_pcm_file(filename, synth.to_pcm16(audio_data), sample_rate)
+
+def save_pcm_file(filename, pcm, sample_rate):
+    """Save mono 16-bit PCM bytes to a WAV file"""
     with wave.open(filename, 'w') as wav_file:
         wav_file.setnchannels(1)  # Mono
         wav_file.setsampwidth(2)  # 16-bit
         wav_file.setframerate(sample_rate)
-        
-        # Convert to bytes
-        for sample in audio_data:
-            wav_file.writeframes(struct.pack('h', sample))
+        wav_file.writeframes(pcm)
     
     print(f"Created {filename}")
 
+# Effects rendered when no definitions file is given
+DEFAULT_EFFECTS = [
+    {'file': 'climb.wav', 'spec': CLIMB_SPEC},
+    {'file': 'slip.wav', 'spec': SLIP_SPEC},
+    {'file': 'hit.wav', 'spec': HIT_SPEC},
+]
+
+def effect_hash(effect):
+    """Hash of an effect's spec, sample rate and the synth version"""
+    return synth.spec_hash(effect['spec'], effect.get('sample_rate', 44100))
+
+def render_effect(effect, output_dir, cache_dir=None):
+    """Render one effect definition to its WAV file"""
+    sample_rate = effect.get('sample_rate', 44100)
+    pcm = synth.Synth(cache_dir).pcm(effect['spec'], sample_rate)
+    save_pcm_file(os.path.join(output_dir, effect['file']), pcm, sample_rate)
+    return effect['file']
+
+def render_effects(effects, output_dir, jobs=1, force=False, cache_dir=None):
+    """
+    Render every effect whose definition changed since it was last written
+    
+    Args:
+        effects: List of effect definitions (file, spec, optional sample_rate)
+        output_dir: Directory for the WAV files and the manifest
+        jobs: Number of worker processes; 1 renders in this process
+        force: Render every effect even if it is up to date
+        cache_dir: Synth cache directory shared with the game, if any
+    
+    Returns:
+        List of the files that were rendered
+    """
+    manifest_path = os.path.join(output_dir, MANIFEST_FILENAME)
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    
+    hashes = {effect['file']: effect_hash(effect) for effect in effects}
+    pending = [effect for effect in effects
+               if force or manifest.get(effect['file']) != hashes[effect['file']]
+               or not os.path.exists(os.path.join(output_dir, effect['file']))]
+    
+    if jobs > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            rendered = list(pool.map(render_effect, pending, [output_dir] * len(pending),
+                                     [cache_dir] * len(pending)))
+    else:
+        rendered = [render_effect(effect, output_dir, cache_dir) for effect in pending]
+    
+    for name in rendered:
+        manifest[name] = hashes[name]
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return rendered
+
 def main():
+    parser = argparse.ArgumentParser(description="Generate the game's sound effects")
+    parser.add_argument('--effects', metavar='PATH',
+                        help="JSON list of effect definitions (default: climb, slip and hit)")
+    parser.add_argument('--output', metavar='DIR', help="output directory (default: assets)")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    parser.add_argument('--force', action='store_true', help="render effects even if they are up to date")
+    args = parser.parse_args()
+    
     # Create the assets directory if it doesn't exist
-    assets_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+    assets_dir = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
     os.makedirs(assets_dir, exist_ok=True)
     
-    # Create and save climb sound
-    audio, sample_rate = create_climb_sound()
-    save_wave_file(os.path.join(assets_dir, 'climb.wav'), audio, sample_rate)
-    
-    # Create and save slip sound
-    audio, sample_rate = create_slip_sound()
-    save_wave_file(os.path.join(assets_dir, 'slip.wav'), audio, sample_rate)
-    
-    # Create and save hit sound
-    audio, sample_rate = create_hit_sound()
-    save_wave_file(os.path.join(assets_dir, 'hit.wav'), audio, sample_rate)
+    effects = DEFAULT_EFFECTS
+    if args.effects:
+        with open(args.effects) as f:
+            effects = json.load(f)
     
-    print("All missing sound files have been created!")
+    start = time.perf_counter()
+    cache_dir = os.path.join(assets_dir, synth.CACHE_DIRNAME)
+    rendered = render_effects(effects, assets_dir, jobs=args.jobs, force=args.force, cache_dir=cache_dir)
+    elapsed = time.perf_counter() - start
+    print(f"Rendered {len(rendered)} of {len(effects)} sound files in {elapsed:.3f}s "
+          f"({len(effects) - len(rendered)} up to date)")
 
 if __name__ == "__main__":
     main()
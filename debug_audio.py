@@ -1,6 +1,34 @@
+"""
+Audio diagnostics and mixer latency benchmark for Lissana Gaha Nagima.
+
+Without arguments, checks that the mixer works and plays each sound in the
+assets directory. With --benchmark, measures sound load time, decoded size
+and play() latency for every combination of mixer buffer size and sample
+rate, each in its own worker process, and writes the results as JSON:
+
+    python debug_audio.py --benchmark --output audio.json
+
+The benchmark uses SDL's disk audio driver by default, which writes the mixed
+output to a file at the pace of a real device. That also gives the output
+latency: the time from play() until the sound reaches the "device". The
+dummy driver only measures the CPU cost of loading and play().
+"""
+import argparse
+import json
 import pygame
 import os
+import platform
 import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+REQUIRED_SOUNDS = ['climb.wav', 'slip.wav', 'fall.wav', 'hit.wav', 'win.wav']
+DEFAULT_BUFFERS = [256, 512, 1024, 2048]
+DEFAULT_RATES = [22050, 44100, 48000]
+OUTPUT_LATENCY_TIMEOUT = 1.0  # seconds to wait for a sound to reach the disk driver's file
 
 def test_audio():
     print("Testing PyGame audio functionality...")
@@ -56,10 +84,11 @@ def test_audio():
         print(f"Error listing files: {e}")
     
     # Check for required sound files
-    required_sounds = ['climb.wav', 'slip.wav', 'fall.wav', 'hit.wav', 'win.wav']
+    required_sounds = REQUIRED_SOUNDS
     missing_sounds = []
     
     print("\nChecking for required sound files:")
+    playing = []
     for sound_file in required_sounds:
         sound_path = os.path.join(assets_dir, sound_file)
         if os.path.isfile(sound_path):
@@ -70,22 +99,29 @@ def test_audio():
                 sound = pygame.mixer.Sound(sound_path)
                 print(f"    - Successfully loaded {sound_file}")
                 
-                # Try to play the sound
+                # Try to play the sound; all of them play at once
                 channel = sound.play()
                 if channel is not None:
                     print(f"    - Successfully played {sound_file}")
+                    playing.append((sound_file, channel, sound.get_length()))
                 else:
                     print(f"    - Warning: Could not play {sound_file} (no channel available)")
                 
-                # Wait a moment to hear the sound
-                pygame.time.wait(500)
-                
             except Exception as e:
                 print(f"    - Error loading {sound_file}: {e}")
         else:
             print(f"  ✗ {sound_file} not found")
             missing_sounds.append(sound_file)
     
+    # Wait for the sounds to finish instead of a fixed pause per sound
+    if playing:
+        deadline = time.perf_counter() + max(length for _, _, length in playing) + 1.0
+        while any(channel.get_busy() for _, channel, _ in playing) and time.perf_counter() < deadline:
+            pygame.time.wait(10)
+        for sound_file, channel, _ in playing:
+            if channel.get_busy():
+                print(f"  Warning: {sound_file} was still playing after its length")
+    
     if missing_sounds:
         print(f"\nMissing sound files: {', '.join(missing_sounds)}")
         print("Please add these files to the assets directory.")
@@ -107,5 +143,165 @@ def test_audio():
     pygame.quit()
     return True
 
+def _percentiles(samples, scale=1.0):
+    if not samples:
+        return None
+    values = np.asarray(samples, dtype=np.float64) * scale
+    p50, p95 = np.percentile(values, [50, 95])
+    return {'p50': round(float(p50), 2), 'p95': round(float(p95), 2), 'max': round(float(values.max()), 2)}
+
+def _wait_for_output(output_path, offset, timeout):
+    """Return when non-silent audio appears after offset in the disk driver's file, or None"""
+    clock = time.perf_counter
+    deadline = clock() + timeout
+    with open(output_path, 'rb') as f:
+        while clock() < deadline:
+            f.seek(offset)
+            data = f.read()
+            if data.strip(b'\0'):
+                return clock()
+            offset += len(data)
+            time.sleep(0.0005)
+    return None
+
+def measure_config(config):
+    """
+    Benchmark one mixer configuration; runs in a worker process
+    
+    Args:
+        config: Dict with driver, frequency, buffer, sound paths and repeats
+    
+    Returns:
+        Dict of measurements for the configuration
+    """
+    driver, frequency, buffer = config['driver'], config['frequency'], config['buffer']
+    os.environ['SDL_AUDIODRIVER'] = driver
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_path = os.path.join(temp_dir, 'output.raw')
+        os.environ['SDL_DISKAUDIOFILE'] = output_path
+        
+        start = time.perf_counter()
+        try:
+            pygame.mixer.init(frequency=frequency, size=-16, channels=2, buffer=buffer)
+        except pygame.error as e:
+            return {'frequency': frequency, 'buffer': buffer, 'error': str(e)}
+        init_ms = (time.perf_counter() - start) * 1000
+        actual = pygame.mixer.get_init()
+        result = {
+            'frequency': frequency,
+            'buffer': buffer,
+            'mixer': list(actual),
+            'init_ms': round(init_ms, 3),
+            'buffer_ms': round(buffer / actual[0] * 1000, 2),
+            'sounds': {},
+        }
+        
+        sounds = []
+        for path in config['sounds']:
+            start = time.perf_counter()
+            sound = pygame.mixer.Sound(path)
+            load_ms = (time.perf_counter() - start) * 1000
+            result['sounds'][os.path.basename(path)] = {
+                'load_ms': round(load_ms, 3),
+                'file_bytes': os.path.getsize(path),
+                'decoded_bytes': len(sound.get_raw()),
+            }
+            sounds.append(sound)
+        
+        # Cost of the play() call itself
+        play_ns = []
+        for _ in range(config['repeats']):
+            for sound in sounds:
+                start = time.perf_counter_ns()
+                channel = sound.play()
+                play_ns.append(time.perf_counter_ns() - start)
+                if channel is not None:
+                    channel.stop()
+        result['play_call_us'] = _percentiles(play_ns, 1e-3)
+        
+        # Time until a probe tone shows up in the output, which the disk driver
+        # writes at the pace of a real device. Asset sounds may start with
+        # silence, so the probe is loud from its first sample.
+        latencies = []
+        if driver == 'disk':
+            probe_frames = actual[0] // 20
+            probe = pygame.mixer.Sound(buffer=np.full(probe_frames * actual[2], 8000, dtype='<i2').tobytes())
+            pygame.time.wait(50)
+            for _ in range(config['repeats']):
+                pygame.mixer.stop()
+                # Let the mixer drain what it already queued
+                pygame.time.wait(int(result['buffer_ms'] * 2) + 5)
+                offset = os.path.getsize(output_path)
+                start = time.perf_counter()
+                probe.play()
+                heard = _wait_for_output(output_path, offset, OUTPUT_LATENCY_TIMEOUT)
+                if heard is not None:
+                    latencies.append((heard - start) * 1000)
+        result['output_latency_ms'] = _percentiles(latencies)
+        pygame.mixer.quit()
+    return result
+
+def run_benchmark(assets_dir, driver='disk', buffers=DEFAULT_BUFFERS, rates=DEFAULT_RATES,
+                  repeats=10, jobs=None):
+    """Measure every buffer size and sample rate combination concurrently"""
+    sounds = [os.path.join(assets_dir, f) for f in REQUIRED_SOUNDS
+              if os.path.isfile(os.path.join(assets_dir, f))]
+    configs = [{'driver': driver, 'frequency': rate, 'buffer': buffer, 'sounds': sounds, 'repeats': repeats}
+               for rate in rates for buffer in buffers]
+    with ProcessPoolExecutor(max_workers=jobs or min(len(configs), os.cpu_count() or 1)) as pool:
+        results = list(pool.map(measure_config, configs))
+    return {
+        'driver': driver,
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'sounds': [os.path.basename(path) for path in sounds],
+        'results': results,
+    }
+
+def print_summary(report, file=sys.stdout):
+    print(f"{'rate':>7}{'buffer':>8}{'buffer ms':>11}{'output p50':>12}{'output p95':>12}"
+          f"{'play() p50':>12}{'load ms':>9}{'decoded KB':>12}", file=file)
+    for result in report['results']:
+        if 'error' in result:
+            print(f"{result['frequency']:>7}{result['buffer']:>8}  error: {result['error']}", file=file)
+            continue
+        output = result['output_latency_ms']
+        play = result['play_call_us']
+        output_p50 = f"{output['p50']:.1f} ms" if output else '-'
+        output_p95 = f"{output['p95']:.1f} ms" if output else '-'
+        play_p50 = f"{play['p50']:.1f} us" if play else '-'
+        load_ms = sum(s['load_ms'] for s in result['sounds'].values())
+        decoded = sum(s['decoded_bytes'] for s in result['sounds'].values()) / 1024
+        print(f"{result['frequency']:>7}{result['buffer']:>8}{result['buffer_ms']:>11.1f}"
+              f"{output_p50:>12}{output_p95:>12}{play_p50:>12}{load_ms:>9.2f}{decoded:>12.0f}", file=file)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the audio setup or benchmark mixer settings")
+    parser.add_argument('--benchmark', action='store_true',
+                        help="measure latency across buffer sizes and sample rates")
+    parser.add_argument('--driver', choices=['disk', 'dummy'], default='disk',
+                        help="SDL audio driver for the benchmark (default: disk)")
+    parser.add_argument('--buffers', type=int, nargs='+', default=DEFAULT_BUFFERS, help="mixer buffer sizes")
+    parser.add_argument('--rates', type=int, nargs='+', default=DEFAULT_RATES, help="sample rates in Hz")
+    parser.add_argument('--repeats', type=int, default=10, help="measurements per sound and configuration")
+    parser.add_argument('--jobs', type=int, help="number of worker processes (default: one per configuration)")
+    parser.add_argument('--output', metavar='PATH', help="write the JSON report to PATH instead of stdout")
+    args = parser.parse_args()
+    
+    if not args.benchmark:
+        return 0 if test_audio() else 1
+    
+    assets_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'assets')
+    report = run_benchmark(assets_dir, args.driver, args.buffers, args.rates, args.repeats, args.jobs)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+        print_summary(report)
+    else:
+        print(text)
+        print_summary(report, file=sys.stderr)
+    return 0
+
 if __name__ == "__main__":
-    test_audio()
+    sys.exit(main())
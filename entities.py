@@ -0,0 +1,131 @@
+"""
+Pooled entity storage for Lissana Gaha Nagima.
+
+Each kind of entity lives in a ComponentPool: one NumPy array per component
+(position, velocity, lifetime, ...) with the live entities packed into the
+first count slots. Removing an entity moves the last live one into its slot,
+so live data stays contiguous and a system can update every entity of a kind
+with a few whole-array operations instead of a Python loop over objects.
+
+The slots past count are the free list: spawning takes the next one, and
+storage only grows, doubling when full. Once a pool has reached its working
+size, spawning and removing entities allocates nothing and creates no objects
+for the garbage collector to track.
+
+pole_sim.CoconutPool is built on ComponentPool; ParticlePool holds the
+cosmetic particles the game draws.
+"""
+import numpy as np
+
+PARTICLE_GRAVITY = 0.25  # added to a particle's vertical speed every step
+
+
+class ComponentPool:
+    """
+    Struct-of-arrays storage for one kind of entity
+
+    Subclasses list their components in fields as name: dtype, and each
+    becomes an array attribute of that name; they must also name them in
+    __slots__.
+    """
+
+    __slots__ = ('count', 'capacity', 'grows')
+    fields = {}
+
+    def __init__(self, capacity=16):
+        for name, dtype in self.fields.items():
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        self.count = 0
+        self.capacity = capacity
+        self.grows = 0
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        self.count = 0
+
+    def alloc(self, n=1):
+        """Claim n slots at the end of the live range and return the first"""
+        start = self.count
+        while start + n > self.capacity:
+            for name in self.fields:
+                array = getattr(self, name)
+                setattr(self, name, np.concatenate([array, np.zeros_like(array)]))
+            self.capacity *= 2
+            self.grows += 1
+        self.count = start + n
+        return start
+
+    def remove(self, i):
+        """Remove entity i by moving the last live entity into its slot"""
+        last = self.count - 1
+        for name in self.fields:
+            array = getattr(self, name)
+            array[i] = array[last]
+        self.count = last
+
+    def remove_where(self, dead):
+        """Remove every entity whose entry in the boolean array dead is set"""
+        # Highest index first so swapped-in entities have already been checked
+        for i in np.flatnonzero(dead)[::-1].tolist():
+            self.remove(i)
+
+
+class ParticlePool(ComponentPool):
+    """Short-lived particles that fly out from a point and fall"""
+
+    __slots__ = ('x', 'y', 'vx', 'vy', 'life', 'rng', 'dead')
+    fields = {
+        'x': np.float32,
+        'y': np.float32,
+        'vx': np.float32,
+        'vy': np.float32,
+        'life': np.int32,
+    }
+
+    def __init__(self, capacity=256, seed=None):
+        super().__init__(capacity)
+        # Separate from the simulation's generator, so effects never change a game
+        self.rng = np.random.default_rng(seed)
+        self.dead = np.zeros(capacity, dtype=bool)
+
+    def burst(self, x, y, count, speed, life):
+        """
+        Spawn count particles at (x, y) flying out at up to speed
+
+        They start with random velocities, mostly upwards, and live for life
+        steps. The random numbers are drawn straight into the pool's arrays.
+        """
+        start = self.alloc(count)
+        end = start + count
+        self.x[start:end] = x
+        self.y[start:end] = y
+        vx = self.vx[start:end]
+        vy = self.vy[start:end]
+        self.rng.random(dtype=np.float32, out=vx)
+        self.rng.random(dtype=np.float32, out=vy)
+        vx *= 2 * speed
+        vx -= speed
+        vy *= -1.25 * speed
+        vy += 0.25 * speed
+        self.life[start:end] = life
+
+
+def update_particles(particles, gravity=PARTICLE_GRAVITY):
+    """Advance every particle by one step and remove the ones that expired"""
+    n = particles.count
+    if n == 0:
+        return
+    vy = particles.vy[:n]
+    vy += gravity
+    particles.x[:n] += particles.vx[:n]
+    particles.y[:n] += vy
+    life = particles.life[:n]
+    life -= 1
+    if len(particles.dead) < particles.capacity:
+        particles.dead = np.zeros(particles.capacity, dtype=bool)
+    dead = particles.dead[:n]
+    np.less_equal(life, 0, out=dead)
+    if dead.any():
+        particles.remove_where(dead)
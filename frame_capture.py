@@ -0,0 +1,275 @@
+"""
+Frame capture and video export for Lissana Gaha Nagima.
+
+FrameWriter streams raw frames from the game loop to disk without making the
+loop wait for the disk. submit(surface) reads the surface's pixels through a
+buffer view, copies them into one of a fixed number of frame-sized chunks and
+queues the chunk for a background thread, which writes it out and hands it
+back. When every chunk is still queued the frame is dropped (and counted), or
+with block=True the caller waits for a chunk to come back. A dropped frame's
+place in the output is filled by repeating the next frame that is queued, so
+the output always holds one frame per submit and plays back at a steady rate.
+
+Output ending in .raw is written as-is, with a .json sidecar giving the size,
+pixel format and frame rate; anything else is piped into ffmpeg, which must be
+on the PATH and picks the container and codec from the extension.
+
+Run this file to render a recorded session, or an attract-mode demo played by
+a scripted climber, headless and faster than real time:
+
+    python frame_capture.py session.lgin -o session.mp4
+    python frame_capture.py --attract 30 -o attract.raw
+"""
+import argparse
+import contextlib
+import json
+import os
+import queue
+import shutil
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import pygame
+
+from input_log import InputLog
+from pole_sim import SCREEN_WIDTH, SCREEN_HEIGHT, BALANCE_KEY_BITS, KEY_R, KEY_UP
+
+# Frames are captured as 32-bit pixels with red, green and blue masks
+# 0xFF0000, 0xFF00 and 0xFF, pygame's default for 32-bit surfaces
+CAPTURE_MASKS = (0xFF0000, 0xFF00, 0xFF, 0)
+PIXEL_FORMAT = 'bgr0' if sys.byteorder == 'little' else '0rgb'  # ffmpeg's name for it
+DEFAULT_BUFFERS = 8  # frame-sized chunks between the game loop and the writer
+ATTRACT_REACTION = 20  # frames the attract-mode climber takes to balance
+
+
+def capture_surface(size):
+    """Off-screen surface in the pixel format frames are captured in"""
+    return pygame.Surface(size, 0, 32, CAPTURE_MASKS)
+
+
+def is_capture_format(surface):
+    return surface.get_bitsize() == 32 and surface.get_masks()[:3] == CAPTURE_MASKS[:3]
+
+
+class FrameWriter:
+    """Writes frames of one size to a raw file or ffmpeg from a background thread"""
+
+    def __init__(self, path, size, fps, buffers=DEFAULT_BUFFERS, block=False):
+        """
+        Args:
+            path: Output file; .raw is written directly, anything else by ffmpeg
+            size: (width, height) of every frame
+            fps: Frame rate recorded in the sidecar or passed to ffmpeg
+            buffers: Number of frame-sized chunks, which bounds memory use
+            block: Wait for a free chunk instead of dropping the frame
+        """
+        self.path = path
+        self.width, self.height = size
+        self.fps = fps
+        self.block = block
+        self.process = None
+        if path.endswith('.raw'):
+            self.stream = open(path, 'wb')
+        else:
+            ffmpeg = shutil.which('ffmpeg')
+            if ffmpeg is None:
+                raise OSError("ffmpeg was not found on the PATH; write a .raw file instead")
+            self.process = subprocess.Popen(
+                [ffmpeg, '-loglevel', 'error', '-y', '-f', 'rawvideo', '-pix_fmt', PIXEL_FORMAT,
+                 '-s', f'{self.width}x{self.height}', '-r', str(fps), '-i', '-',
+                 '-pix_fmt', 'yuv420p', path],
+                stdin=subprocess.PIPE)
+            self.stream = self.process.stdin
+
+        self.free = queue.Queue()
+        for _ in range(buffers):
+            self.free.put(np.empty((self.height, self.width * 4), dtype=np.uint8))
+        self.ready = queue.Queue()
+        self.scratch = None
+        self.error = None
+        self.submitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.owed = 0  # dropped frames the next queued frame is repeated for
+        self.thread = threading.Thread(target=self._run, name='frame-writer', daemon=True)
+        self.thread.start()
+
+    def submit(self, surface, repeat=1):
+        """
+        Queue a copy of surface's pixels to be written repeat times
+
+        Returns whether it was queued. Raises the writer thread's error if
+        writing has failed.
+        """
+        if self.error is not None:
+            raise self.error
+        if repeat < 1 and not self.owed:
+            return False
+        try:
+            chunk = self.free.get(block=self.block)
+        except queue.Empty:
+            self.dropped += repeat
+            self.owed += repeat
+            return False
+
+        if not is_capture_format(surface):
+            # e.g. a 16-bit window: convert with one blit first
+            if self.scratch is None:
+                self.scratch = capture_surface((self.width, self.height))
+            self.scratch.blit(surface, (0, 0))
+            surface = self.scratch
+        # The view locks the surface only until the rows are copied out
+        view = surface.get_view('0')
+        rows = np.frombuffer(view, dtype=np.uint8).reshape(self.height, surface.get_pitch())
+        np.copyto(chunk, rows[:, :self.width * 4])
+        del rows, view
+
+        self.ready.put((chunk, repeat + self.owed))
+        self.submitted += repeat
+        self.owed = 0
+        return True
+
+    def flush(self, surface):
+        """Queue surface for the dropped frames still owed, waiting for a free chunk"""
+        if self.owed:
+            block, self.block = self.block, True
+            try:
+                self.submit(surface, repeat=0)
+            finally:
+                self.block = block
+
+    def _run(self):
+        while True:
+            item = self.ready.get()
+            if item is None:
+                break
+            chunk, repeat = item
+            if self.error is None:
+                try:
+                    for _ in range(repeat):
+                        self.stream.write(chunk)
+                        self.written += 1
+                except (OSError, ValueError) as e:
+                    self.error = e
+            self.free.put(chunk)
+
+    def close(self):
+        """Write out the queued frames, finish the file and return the stats"""
+        self.ready.put(None)
+        self.thread.join()
+        try:
+            self.stream.close()
+        except OSError as e:
+            self.error = self.error or e
+        if self.process is not None:
+            self.process.wait()
+        elif self.error is None:
+            with open(os.path.splitext(self.path)[0] + '.json', 'w') as f:
+                json.dump({
+                    'width': self.width,
+                    'height': self.height,
+                    'pix_fmt': PIXEL_FORMAT,
+                    'fps': self.fps,
+                    'frames': self.written,
+                    'dropped': self.dropped,
+                    'ffmpeg': (f"ffmpeg -f rawvideo -pix_fmt {PIXEL_FORMAT} -s {self.width}x{self.height} "
+                               f"-r {self.fps} -i {os.path.basename(self.path)} out.mp4"),
+                }, f, indent=2)
+        return self.stats()
+
+    def stats(self):
+        return {
+            'submitted': self.submitted,
+            'written': self.written,
+            'dropped': self.dropped,
+            'error': str(self.error) if self.error else None,
+        }
+
+
+def attract_keys(sim, frames):
+    """Keys for a scripted climber that balances after ATTRACT_REACTION frames"""
+    for _ in range(frames):
+        if sim.game_over or sim.win:
+            yield KEY_R
+        elif sim.is_slipping and sim.slip_timer >= ATTRACT_REACTION:
+            yield KEY_UP | BALANCE_KEY_BITS[sim.balance_key_needed]
+        else:
+            yield KEY_UP
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a recorded session or an attract-mode demo to video")
+    parser.add_argument('log', nargs='?', help="input log recorded with slippery_pole_game.py --record")
+    parser.add_argument('--attract', type=float, metavar='SECONDS',
+                        help="instead of a log, render SECONDS of a scripted climber")
+    parser.add_argument('-o', '--output', required=True, help="output .raw file, or a video file for ffmpeg")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the attract-mode game")
+    parser.add_argument('--pole-screens', type=int, default=1, metavar='N', help="pole height for attract mode")
+    parser.add_argument('--dirty-rects', action='store_true', help="render with the dirty-rect renderer")
+    parser.add_argument('--buffers', type=int, default=DEFAULT_BUFFERS, help="frame chunks queued for the writer")
+    parser.add_argument('--drop', action='store_true',
+                        help="drop frames when the writer falls behind instead of waiting for it")
+    args = parser.parse_args()
+    if (args.log is None) == (args.attract is None):
+        parser.error("give either an input log or --attract SECONDS")
+
+    # Nothing is shown or heard; the game renders into an off-screen surface
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+    # Imported here because the game imports this module for --capture
+    with contextlib.redirect_stdout(sys.stderr):
+        from slippery_pole_game import Game, SIM_RATE
+
+    class CaptureGame(Game):
+        """Game whose keys all come from the log or the script"""
+
+        def held_keys(self):
+            return 0
+
+    if args.log:
+        log = InputLog.load(args.log)
+        seed, pole_screens = log.seed, log.pole_screens
+    else:
+        log = None
+        seed, pole_screens = args.seed, args.pole_screens
+    with contextlib.redirect_stdout(sys.stderr):
+        game = CaptureGame(dirty_rects=args.dirty_rects, seed=seed, pole_screens=pole_screens,
+                           defer_audio=True, offscreen=True)
+    keys = log.keys if log else attract_keys(game.sim, round(args.attract * SIM_RATE))
+
+    # One frame per simulation step, so the video plays at SIM_RATE
+    try:
+        writer = FrameWriter(args.output, (SCREEN_WIDTH, SCREEN_HEIGHT), SIM_RATE,
+                             buffers=args.buffers, block=not args.drop)
+    except OSError as e:
+        parser.error(str(e))
+    start = time.perf_counter()
+    try:
+        for step_keys in keys:
+            game.pressed_keys = step_keys
+            game.update()
+            game.draw()
+            writer.submit(game.screen)
+        writer.flush(game.screen)
+    finally:
+        stats = writer.close()
+    elapsed = time.perf_counter() - start
+
+    if stats['error']:
+        print(f"Writing {args.output} failed: {stats['error']}")
+        return 1
+    speed = stats['written'] / SIM_RATE / elapsed if elapsed else 0.0
+    print(f"Wrote {stats['written']} frames to {args.output} in {elapsed:.2f}s "
+          f"({speed:.1f}x real time), {stats['dropped']} dropped and filled by repeating the next frame")
+    if log is not None and game.sim.state_hash() != log.final_hash:
+        print("Warning: the session did not end in its recorded state")
+    pygame.quit()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
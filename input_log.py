@@ -0,0 +1,154 @@
+"""
+Input recording and headless replay for Lissana Gaha Nagima.
+
+A session is fully determined by the RNG seed and the KEY_* bitmask fed to
+PoleSim.step on every simulation step, so that is all an input log stores.
+Logs end with a hash of the final game state; replaying a log steps a fresh
+PoleSim through the same inputs as fast as possible and checks the hash.
+
+File layout: a fixed header (magic, version, seed, step count, pole height in
+screens, SHA-256 of the final state) followed by the per-step key bytes,
+zlib-compressed. Version 1 logs, which predate tall poles, have no pole height
+and replay on a one-screen pole.
+
+Replay one or more logs, or every log in a directory:
+
+    python input_log.py recordings/ --jobs 8
+"""
+import argparse
+import json
+import os
+import random
+import struct
+import sys
+import time
+import zlib
+from multiprocessing import Pool
+
+from pole_sim import PoleSim
+
+LOG_MAGIC = b'LGINPUT1'
+LOG_VERSION = 2
+LOG_EXTENSION = '.lgin'
+_PREFIX = struct.Struct('<8sH')
+_HEADER = struct.Struct('<8sHQIH32s')
+_HEADER_V1 = struct.Struct('<8sHQI32s')
+MAX_SEED = 2 ** 64 - 1  # seeds are stored as unsigned 64-bit integers
+MAX_POLE_SCREENS = 2 ** 16 - 1  # and pole heights as unsigned 16-bit ones
+
+
+class InputLog:
+    """Seed, pole height and per-step key bitmasks of one session"""
+
+    def __init__(self, seed, keys=None, final_hash=None, pole_screens=1):
+        self.seed = seed
+        self.keys = keys if keys is not None else bytearray()
+        self.final_hash = final_hash
+        self.pole_screens = pole_screens
+
+    def __len__(self):
+        return len(self.keys)
+
+    def record(self, keys):
+        self.keys.append(keys)
+
+    def save(self, path, final_hash):
+        self.final_hash = final_hash
+        header = _HEADER.pack(LOG_MAGIC, LOG_VERSION, self.seed, len(self.keys), self.pole_screens,
+                              final_hash)
+        with open(path, 'wb') as f:
+            f.write(header)
+            f.write(zlib.compress(bytes(self.keys), 9))
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, version = _PREFIX.unpack_from(data)
+        if magic != LOG_MAGIC or version not in (1, LOG_VERSION):
+            raise ValueError(f"{path} is not a version 1 or {LOG_VERSION} input log")
+        if version == 1:
+            _, _, seed, steps, final_hash = _HEADER_V1.unpack_from(data)
+            pole_screens = 1
+            header_size = _HEADER_V1.size
+        else:
+            _, _, seed, steps, pole_screens, final_hash = _HEADER.unpack_from(data)
+            header_size = _HEADER.size
+        keys = zlib.decompress(data[header_size:])
+        if len(keys) != steps:
+            raise ValueError(f"{path} is truncated: expected {steps} steps, found {len(keys)}")
+        return cls(seed, keys, final_hash, pole_screens)
+
+
+def new_seed():
+    return random.getrandbits(63)
+
+
+def replay(log):
+    """Run a log through a fresh PoleSim and return the simulation"""
+    sim = PoleSim(rng=random.Random(log.seed), pole_screens=log.pole_screens)
+    step = sim.step
+    for keys in log.keys:
+        step(keys)
+    return sim
+
+
+def replay_file(path):
+    """Replay one log file and return a result dict"""
+    log = InputLog.load(path)
+    start = time.perf_counter()
+    sim = replay(log)
+    elapsed = time.perf_counter() - start
+    return {
+        'path': path,
+        'steps': len(log),
+        'seconds': elapsed,
+        'ok': sim.state_hash() == log.final_hash,
+        'score': sim.score,
+        'win': sim.win,
+    }
+
+
+def find_logs(paths):
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                found.extend(os.path.join(root, f) for f in sorted(files) if f.endswith(LOG_EXTENSION))
+        else:
+            found.append(path)
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded sessions and check their final state")
+    parser.add_argument('paths', nargs='+', help="input log files or directories containing them")
+    parser.add_argument('--jobs', type=int, default=1, help="number of worker processes")
+    parser.add_argument('--json', metavar='PATH', help="write per-log results as JSON")
+    args = parser.parse_args()
+
+    logs = find_logs(args.paths)
+    start = time.perf_counter()
+    if args.jobs > 1:
+        with Pool(args.jobs) as pool:
+            results = pool.map(replay_file, logs, chunksize=max(1, len(logs) // (args.jobs * 4)))
+    else:
+        results = [replay_file(path) for path in logs]
+    elapsed = time.perf_counter() - start
+
+    failures = [r for r in results if not r['ok']]
+    for result in failures:
+        print(f"MISMATCH {result['path']} after {result['steps']} steps")
+    steps = sum(r['steps'] for r in results)
+    rate = steps / elapsed if elapsed else 0.0
+    print(f"Replayed {len(results)} logs, {steps} steps in {elapsed:.2f}s ({rate:.0f} steps/s), "
+          f"{len(failures)} mismatches")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,426 @@
+"""
+Multi-climber simulation for Lissana Gaha Nagima.
+
+Several poles stand side by side, POLE_SPACING pixels apart, each with its
+own climber following the PoleSim rules. Coconuts spawn anywhere across the
+whole field into one shared CoconutPool, with each pole adding its own spawn
+roll so the coconut density per pole matches the single-player game.
+
+Coconut-vs-climber collisions go through ClimberGrid, a uniform grid of
+x columns listing the climbers that overlap each column. A coconut is only
+tested against the climbers in its own column, so the cost of a frame grows
+with the number of live coconuts rather than coconuts x climbers. Coconuts
+fall straight down and climbers never move sideways, so columns are all the
+partitioning needed and the grid is built once per game.
+
+The rules are a vectorized copy of PoleSim's. verify also plays a single
+climber here and in PoleSim on the same inputs and random outcomes, so the
+two cannot drift apart unnoticed. This is the simulation side of local
+multiplayer only; the game window is still single-player.
+
+    python multi_sim.py verify      # grid matches brute force, one climber matches PoleSim
+    python multi_sim.py benchmark   # collision cost by climbers and coconuts
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from pole_sim import (
+    PoleSim, CoconutPool, SCREEN_HEIGHT, CLIMBER_WIDTH, CLIMBER_HEIGHT, KEY_UP, KEY_A, KEY_D, KEY_R,
+    BALANCE_KEY_BITS, EVENT_RESET, EVENT_CLIMB, EVENT_SLIP, EVENT_BALANCE, EVENT_FALL, EVENT_HIT,
+    EVENT_WIN, EVENT_GAME_OVER, difficulty,
+)
+
+POLE_SPACING = CLIMBER_WIDTH * 2  # distance between neighbouring poles
+
+
+class ClimberGrid:
+    """Uniform grid of x columns, each listing the climbers that overlap it"""
+
+    def __init__(self, field_width, cell_width=CLIMBER_WIDTH):
+        self.cell_width = cell_width
+        self.cells = field_width // cell_width + 1
+        self.table = np.full((self.cells, 1), -1, dtype=np.int64)
+
+    def build(self, left, right):
+        """Index climbers covering the open x intervals (left[j], right[j])"""
+        cw = self.cell_width
+        members = [[] for _ in range(self.cells)]
+        for j, (lo, hi) in enumerate(zip(left.tolist(), right.tolist())):
+            # Coconuts strictly inside the interval have lo < x <= hi - 1
+            for cell in range(max(lo + 1, 0) // cw, min((hi - 1) // cw, self.cells - 1) + 1):
+                members[cell].append(j)
+        width = max(1, max(len(m) for m in members))
+        self.table = np.full((self.cells, width), -1, dtype=np.int64)
+        for cell, m in enumerate(members):
+            self.table[cell, :len(m)] = m
+
+    def pairs(self, x):
+        """(coconut index, climber index) arrays of candidate pairs for coconut x positions"""
+        cells = np.clip(x // self.cell_width, 0, self.cells - 1)
+        if self.table.shape[1] == 1:
+            # At most one climber per column, the usual case
+            climber = self.table[cells, 0]
+            coconut = np.flatnonzero(climber >= 0)
+            return coconut, climber[coconut]
+        candidates = self.table[cells]
+        coconut, slot = np.nonzero(candidates >= 0)
+        return coconut, candidates[coconut, slot]
+
+
+class MultiPoleSim:
+    """Climbers on side-by-side poles sharing one field of coconuts"""
+
+    def __init__(self, players, seed=0, params=None, broadphase='grid'):
+        """
+        Args:
+            players: Number of poles and climbers
+            seed: Seed for the simulation's NumPy generator
+            params: Difficulty overrides, see pole_sim.DEFAULT_PARAMS
+            broadphase: 'grid', or 'brute' to test every coconut against
+                every climber
+        """
+        self.players = players
+        self.rng = np.random.default_rng(seed)
+        self.params = difficulty(params)
+        self.climb_speed = self.params['climb_speed']
+        self.slip_speed = self.params['slip_speed']
+        self.fall_speed = self.params['fall_speed']
+        self.coconut_speed = self.params['coconut_speed']
+        self.coconut_spawn_rate = self.params['coconut_spawn_rate']
+        self.broadphase = broadphase
+
+        self.field_width = players * POLE_SPACING
+        self.pole_top = 50
+        self.pole_bottom = SCREEN_HEIGHT - 50
+        self.pole_height = self.pole_bottom - self.pole_top
+        self.pole_center = np.arange(players) * POLE_SPACING + POLE_SPACING // 2
+        self.climber_x = self.pole_center - CLIMBER_WIDTH // 2
+        self.grid = ClimberGrid(self.field_width)
+        self.grid.build(self.climber_x, self.climber_x + CLIMBER_WIDTH)
+
+        self.game_over = np.zeros(players, dtype=bool)
+        self.win = np.zeros(players, dtype=bool)
+        self.score = np.zeros(players, dtype=np.int64)
+        self.climber_y = np.zeros(players, dtype=np.int64)
+        self.is_slipping = np.zeros(players, dtype=bool)
+        self.slip_timer = np.zeros(players, dtype=np.int64)
+        self.balance_key_needed = np.zeros(players, dtype=np.uint8)  # KEY_A, KEY_D or 0
+        self.coconut_timer = np.zeros(players, dtype=np.int64)
+        self.coconuts = CoconutPool()
+        self.reset()
+
+    def reset(self, mask=None):
+        """Reset every climber, or only those selected by a boolean mask"""
+        if mask is None:
+            mask = np.ones(self.players, dtype=bool)
+        if mask.all():
+            self.coconuts.clear()
+        self.game_over[mask] = False
+        self.win[mask] = False
+        self.score[mask] = 0
+        self.climber_y[mask] = SCREEN_HEIGHT - CLIMBER_HEIGHT - 50
+        self.is_slipping[mask] = False
+        self.slip_timer[mask] = 0
+        self.balance_key_needed[mask] = 0
+        self.coconut_timer[mask] = 0
+
+    def candidate_pairs(self):
+        """(coconut index, climber index) pairs the broadphase says may touch"""
+        x, _ = self.coconuts.positions()
+        if self.broadphase == 'brute':
+            coconut = np.repeat(np.arange(len(x)), self.players)
+            return coconut, np.tile(np.arange(self.players), len(x))
+        return self.grid.pairs(x)
+
+    def collide(self, active):
+        """
+        Knock climbers down for coconuts inside them and remove those coconuts
+
+        Each climber takes its hits in spawn order, tested against where the
+        previous hit left it, as in PoleSim.
+
+        Returns:
+            Array with the number of hits per climber
+        """
+        hits = np.zeros(self.players, dtype=np.int64)
+        coconuts = self.coconuts
+        if not len(coconuts):
+            return hits
+        coconut, climber = self.candidate_pairs()
+        keep = active[climber]
+        coconut, climber = coconut[keep], climber[keep]
+        x, y = coconuts.positions()
+        seq = coconuts.seq[:len(coconuts)]
+        left = self.climber_x[climber]
+        inside_x = (left < x[coconut]) & (x[coconut] < left + CLIMBER_WIDTH)
+        coconut, climber = coconut[inside_x], climber[inside_x]
+        removed = np.zeros(len(coconuts), dtype=bool)
+        last_hit = np.full(self.players, -1, dtype=np.int64)
+        while len(coconut):
+            top = self.climber_y[climber]
+            cy = y[coconut]
+            inside = ((top < cy) & (cy < top + CLIMBER_HEIGHT)
+                      & (seq[coconut] > last_hit[climber]) & ~removed[coconut])
+            if not inside.any():
+                break
+            c, j = coconut[inside], climber[inside]
+            # Earliest-spawned coconut inside each climber
+            order = np.lexsort((seq[c], j))
+            first = np.unique(j[order], return_index=True)[1]
+            c, j = c[order[first]], j[order[first]]
+            removed[c] = True
+            last_hit[j] = seq[c]
+            self.climber_y[j] += self.fall_speed * 5
+            hits[j] += 1
+        for i in np.flatnonzero(removed)[::-1].tolist():
+            coconuts.remove(i)
+        return hits
+
+    def step(self, keys):
+        """
+        Advance every climber by one frame
+
+        Args:
+            keys: KEY_* bitmask per climber, or one int for all of them
+
+        Returns:
+            List of (climber index, EVENT_*) tuples
+        """
+        keys = np.broadcast_to(np.asarray(keys, dtype=np.uint8), (self.players,))
+        y = self.climber_y
+        events = []
+
+        def record(event, mask):
+            events.extend((j, event) for j in np.flatnonzero(mask).tolist())
+
+        over = self.game_over | self.win
+        restart = over & (keys & KEY_R != 0)
+        if restart.any():
+            self.reset(restart)
+            record(EVENT_RESET, restart)
+        balance = ~over & self.is_slipping & (keys & self.balance_key_needed != 0)
+        self.is_slipping[balance] = False
+        self.balance_key_needed[balance] = 0
+        record(EVENT_BALANCE, balance)
+
+        active = ~(self.game_over | self.win)
+
+        climb = active & (keys & KEY_UP != 0) & ~self.is_slipping
+        y[climb] -= self.climb_speed
+        record(EVENT_CLIMB, climb)
+
+        rolls = self.rng.random((2, self.players))
+        slip = active & ~self.is_slipping & (rolls[0] < 0.01)
+        self.is_slipping |= slip
+        self.balance_key_needed[slip] = np.where(rolls[1][slip] < 0.5, KEY_A, KEY_D)
+        record(EVENT_SLIP, slip)
+
+        slipping = active & self.is_slipping
+        self.slip_timer[slipping] += 1
+        y[slipping] += self.slip_speed
+        falling = slipping & (self.slip_timer > 60)
+        y[falling] += self.fall_speed
+        record(EVENT_FALL, falling)
+        recover = falling & (self.slip_timer > 90)
+        self.is_slipping[recover] = False
+        self.balance_key_needed[recover] = 0
+        self.slip_timer[recover] = 0
+
+        # Every pole still in play rolls for a coconut anywhere on the field
+        self.coconut_timer[active] += 1
+        due = active & (self.coconut_timer >= self.coconut_spawn_rate)
+        self.coconut_timer[due] = 0
+        spawn = due & (self.rng.random(self.players) < 0.5)
+        for x in self.rng.integers(0, self.field_width + 1, size=int(spawn.sum())).tolist():
+            self.coconuts.spawn(x, 0)
+
+        # As in PoleSim, the coconuts stand still once every game has ended
+        if active.any():
+            self.coconuts.move(self.coconut_speed)
+            hits = self.collide(active)
+            for j in np.flatnonzero(hits).tolist():
+                events.extend([(j, EVENT_HIT)] * int(hits[j]))
+            self.coconuts.cull_below(SCREEN_HEIGHT)
+
+        won = active & (y < self.pole_top)
+        y[won] = self.pole_top
+        self.win |= won
+        record(EVENT_WIN, won)
+        lost = active & (y > self.pole_bottom - CLIMBER_HEIGHT)
+        y[lost] = self.pole_bottom - CLIMBER_HEIGHT
+        self.game_over |= lost
+        record(EVENT_GAME_OVER, lost)
+
+        score = ((self.pole_bottom - y - CLIMBER_HEIGHT) / self.pole_height * 100).astype(np.int64)
+        self.score[active] = score[active]
+        return events
+
+
+def _random_keys(rng, players):
+    choices = np.array([0, KEY_UP, KEY_UP | KEY_A, KEY_UP | KEY_D, KEY_R], dtype=np.uint8)
+    return rng.choice(choices, size=players, p=[0.1, 0.6, 0.1, 0.1, 0.1])
+
+
+def verify(players=16, frames=5000, seed=0):
+    """Play the same game with grid and brute-force collisions and compare"""
+    sims = [MultiPoleSim(players, seed, broadphase=b) for b in ('grid', 'brute')]
+    inputs = np.random.default_rng(seed)
+    hits = 0
+    for frame in range(frames):
+        keys = _random_keys(inputs, players)
+        events = [sim.step(keys) for sim in sims]
+        if events[0] != events[1] or not np.array_equal(sims[0].climber_y, sims[1].climber_y):
+            print(f"Grid and brute-force collisions differ at frame {frame}")
+            return False
+        hits += sum(1 for _, event in events[0] if event == EVENT_HIT)
+    print(f"Grid matches brute force for {players} climbers x {frames} frames ({hits} hits)")
+    return True
+
+
+class _RecordingGenerator:
+    """NumPy generator that keeps what it drew this step, for _ScriptedRolls"""
+
+    def __init__(self, seed):
+        self.rng = np.random.default_rng(seed)
+        self.draws = []
+
+    def random(self, size=None):
+        values = self.rng.random(size)
+        self.draws.append(values)
+        return values
+
+    def integers(self, low, high, size=None):
+        values = self.rng.integers(low, high, size)
+        self.draws.append(values)
+        return values
+
+
+class _ScriptedRolls:
+    """Random outcomes for a PoleSim, replaying what a one-climber MultiPoleSim drew"""
+
+    def __init__(self):
+        self.queue = []
+
+    def load(self, sim, keys, draws, x_offset):
+        """Queue the rolls sim will make on its next step with keys, from draws"""
+        rolls, spawn_rolls, *xs = draws
+        self.queue = []
+        self.key = KEY_A if rolls[1][0] < 0.5 else KEY_D
+        self.xs = [int(x) + x_offset for x in (xs[0] if xs else [])]
+        over = sim.game_over or sim.win
+        if over and not keys & KEY_R:
+            return
+        slipping = not over and sim.is_slipping and not keys & BALANCE_KEY_BITS[sim.balance_key_needed]
+        if not slipping:
+            self.queue.append(float(rolls[0][0]))
+        timer = 0 if over else sim.coconut_timer
+        if timer + 1 >= sim.coconut_spawn_rate:
+            self.queue.append(float(spawn_rolls[0]))
+
+    def random(self):
+        return self.queue.pop(0)
+
+    def choice(self, keys):
+        return next(key for key in keys if BALANCE_KEY_BITS[key] == self.key)
+
+    def randint(self, low, high):
+        return self.xs.pop(0)
+
+
+def check_rules(frames=20000, seed=0):
+    """
+    Play one climber in MultiPoleSim and in PoleSim on the same inputs and
+    random outcomes, and compare them
+
+    MultiPoleSim has its own vectorized copy of the PoleSim rules; this
+    catches the two drifting apart. Positions are compared relative to the
+    pole, since the single-player pole stands in the middle of the screen.
+    """
+    multi = MultiPoleSim(1, seed)
+    multi.rng = _RecordingGenerator(seed)
+    rolls = _ScriptedRolls()
+    single = PoleSim(rng=rolls)
+    x_offset = single.climber_x - int(multi.climber_x[0])
+    inputs = np.random.default_rng(seed)
+    hits = 0
+    for frame in range(frames):
+        keys = int(_random_keys(inputs, 1)[0])
+        multi.rng.draws = []
+        multi_events = [event for _, event in multi.step(keys)]
+        rolls.load(single, keys, multi.rng.draws, x_offset)
+        events = single.step(keys)
+        x, y = multi.coconuts.positions()
+        order = np.argsort(multi.coconuts.seq[:len(multi.coconuts)], kind='stable')
+        multi_state = (
+            bool(multi.game_over[0]), bool(multi.win[0]), int(multi.score[0]), int(multi.climber_y[0]),
+            bool(multi.is_slipping[0]), int(multi.slip_timer[0]), int(multi.balance_key_needed[0]),
+            int(multi.coconut_timer[0]), [[int(x[i]) + x_offset, int(y[i])] for i in order],
+        )
+        state = (
+            single.game_over, single.win, single.score, single.climber_y, single.is_slipping,
+            single.slip_timer, BALANCE_KEY_BITS.get(single.balance_key_needed, 0),
+            single.coconut_timer, single.coconuts.to_list(),
+        )
+        if events != multi_events or state != multi_state:
+            print(f"MultiPoleSim and PoleSim differ at frame {frame}:\n  {multi_events} {multi_state}\n"
+                  f"  {events} {state}")
+            return False
+        hits += events.count(EVENT_HIT)
+    print(f"One climber in MultiPoleSim matches PoleSim for {frames} frames ({hits} hits)")
+    return True
+
+
+def benchmark(climber_counts, coconut_counts, frames=200, seed=0):
+    """
+    Time the collision pass for every climber and coconut count
+
+    Climbers sit at the top of their poles and coconuts are spread over the
+    rest of the screen, so every frame tests the same pairs and nothing is hit.
+    """
+    print(f"{'climbers':>9}{'coconuts':>10}{'grid pairs':>12}{'grid us':>10}{'brute pairs':>13}{'brute us':>10}")
+    for players in climber_counts:
+        for count in coconut_counts:
+            rng = np.random.default_rng(seed)
+            row = []
+            for broadphase in ('grid', 'brute'):
+                sim = MultiPoleSim(players, seed, broadphase=broadphase)
+                sim.climber_y[:] = sim.pole_top
+                xs = rng.integers(0, sim.field_width + 1, size=count)
+                ys = rng.integers(sim.pole_top + CLIMBER_HEIGHT, SCREEN_HEIGHT, size=count)
+                active = np.ones(players, dtype=bool)
+                pool = sim.coconuts
+                for _ in range(count):
+                    pool.spawn(0, 0)
+                pairs = len(sim.candidate_pairs()[0])
+                elapsed = 0
+                pool.x[:count] = xs
+                pool.y[:count] = ys
+                for _ in range(frames):
+                    start = time.perf_counter_ns()
+                    sim.collide(active)
+                    elapsed += time.perf_counter_ns() - start
+                row.extend([pairs, elapsed / frames / 1000])
+            print(f"{players:>9}{count:>10}{row[0]:>12}{row[1]:>10.1f}{row[2]:>13}{row[3]:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check or benchmark multi-climber collisions")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('verify', help="compare grid and brute-force collisions, and one climber with PoleSim")
+    bench = subparsers.add_parser('benchmark', help="time collisions by climber and coconut count")
+    bench.add_argument('--climbers', type=int, nargs='+', default=[1, 4, 16, 64])
+    bench.add_argument('--coconuts', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    bench.add_argument('--frames', type=int, default=200, help="timed collision passes per cell")
+    args = parser.parse_args()
+
+    if args.command == 'verify':
+        return 0 if verify() and check_rules() else 1
+    benchmark(args.climbers, args.coconuts, args.frames)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
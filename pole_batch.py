@@ -0,0 +1,331 @@
+"""
+Vectorized batch simulator for Lissana Gaha Nagima.
+
+Steps N independent climbs in lockstep with NumPy. Every piece of per-game
+state from pole_sim.PoleSim is held as an array with one entry per game, and
+each frame is a fixed number of array operations no matter how many games
+are running.
+
+Random numbers come from CounterRNG, where each draw is a hash of
+(seed, game index, draw number). A PoleSim given CounterRNG(seed, i) makes
+exactly the same draws as game i of a BatchSim(n, seed), so the two produce
+identical games for identical inputs.
+"""
+import sys
+import time
+
+import numpy as np
+
+from pole_sim import (
+    PoleSim, SCREEN_WIDTH, SCREEN_HEIGHT, CLIMBER_WIDTH, CLIMBER_HEIGHT,
+    COCONUT_SPEED, COCONUT_SPAWN_RATE, KEY_UP, KEY_A, KEY_D, KEY_R, difficulty,
+)
+
+_MASK64 = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+_MIX1 = 0xBF58476D1CE4E5B9
+_MIX2 = 0x94D049BB133111EB
+
+
+def coconut_slots(coconut_speed, coconut_spawn_rate):
+    """Most coconuts that can be alive at once: frames on screen / frames between spawns"""
+    lifetime = SCREEN_HEIGHT // coconut_speed
+    # Coconuts faster than a screen per frame still exist for the frame they spawn
+    return max(1, -(-lifetime // coconut_spawn_rate))
+
+
+# Coconut slots per game at the default difficulty
+COCONUT_SLOTS = coconut_slots(COCONUT_SPEED, COCONUT_SPAWN_RATE)
+
+
+def _mix64(z):
+    """SplitMix64 finalizer on a Python int"""
+    z = ((z ^ (z >> 30)) * _MIX1) & _MASK64
+    z = ((z ^ (z >> 27)) * _MIX2) & _MASK64
+    return z ^ (z >> 31)
+
+
+def _mix64_array(z):
+    """SplitMix64 finalizer on a uint64 array (wraps like the scalar version)"""
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(_MIX1)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(_MIX2)
+    return z ^ (z >> np.uint64(31))
+
+
+def _stream_key(seed, stream):
+    return _mix64((seed * _GOLDEN + stream) & _MASK64)
+
+
+class CounterRNG:
+    """
+    Counter-based random source for one game of a batch
+
+    Implements the random(), choice() and randint() calls PoleSim makes, with
+    draw k of stream s derived only from (seed, s, k).
+    """
+
+    def __init__(self, seed, stream=0):
+        self.key = _stream_key(seed, stream)
+        self.counter = 0
+
+    def random(self):
+        z = _mix64((self.key + self.counter * _GOLDEN) & _MASK64)
+        self.counter += 1
+        return (z >> 11) * (1.0 / (1 << 53))
+
+    def choice(self, seq):
+        return seq[int(self.random() * len(seq))]
+
+    def randint(self, a, b):
+        return a + int(self.random() * (b - a + 1))
+
+
+class BatchSim:
+    """N games of the PoleSim rules held as NumPy arrays"""
+
+    def __init__(self, n, seed=0, first_stream=0, params=None):
+        """
+        Args:
+            n: Number of games
+            seed: Seed shared by every game
+            first_stream: Random stream of game 0; game i uses first_stream + i,
+                so a large batch can be split into smaller ones that play the
+                same games
+            params: Difficulty overrides, see pole_sim.DEFAULT_PARAMS
+        """
+        self.n = n
+        self.params = difficulty(params)
+        self.climb_speed = self.params['climb_speed']
+        self.slip_speed = self.params['slip_speed']
+        self.fall_speed = self.params['fall_speed']
+        self.coconut_speed = self.params['coconut_speed']
+        self.coconut_spawn_rate = self.params['coconut_spawn_rate']
+        self.coconut_slots = coconut_slots(self.coconut_speed, self.coconut_spawn_rate)
+        self.seed = seed
+        self.first_stream = first_stream
+        self.rows = np.arange(n)
+        keys = [_stream_key(seed, first_stream + i) for i in range(n)]
+        self.rng_key = np.array(keys, dtype=np.uint64)
+        self.rng_counter = np.zeros(n, dtype=np.uint64)
+
+        self.pole_top = 50
+        self.pole_bottom = SCREEN_HEIGHT - 50
+        self.pole_height = self.pole_bottom - self.pole_top
+        self.climber_x = SCREEN_WIDTH // 2 - CLIMBER_WIDTH // 2
+
+        self.game_over = np.zeros(n, dtype=bool)
+        self.win = np.zeros(n, dtype=bool)
+        self.score = np.zeros(n, dtype=np.int64)
+        self.climber_y = np.zeros(n, dtype=np.int64)
+        self.is_slipping = np.zeros(n, dtype=bool)
+        self.slip_timer = np.zeros(n, dtype=np.int64)
+        self.balance_key_needed = np.zeros(n, dtype=np.uint8)  # KEY_A, KEY_D or 0
+        self.coconut_timer = np.zeros(n, dtype=np.int64)
+
+        # Coconuts live in a ring of slots per game, oldest at coconut_head
+        self.coconut_x = np.zeros((n, self.coconut_slots), dtype=np.int64)
+        self.coconut_y = np.zeros((n, self.coconut_slots), dtype=np.int64)
+        self.coconut_alive = np.zeros((n, self.coconut_slots), dtype=bool)
+        self.coconut_head = np.zeros(n, dtype=np.int64)
+
+        # Per-game counters for statistics
+        self.frames = np.zeros(n, dtype=np.int64)
+        self.hits = np.zeros(n, dtype=np.int64)
+        self.slips = np.zeros(n, dtype=np.int64)
+
+        self.reset()
+
+    def reset(self, mask=None):
+        """Reset every game, or only the games selected by a boolean mask"""
+        if mask is None:
+            mask = np.ones(self.n, dtype=bool)
+        self.game_over[mask] = False
+        self.win[mask] = False
+        self.score[mask] = 0
+        self.climber_y[mask] = SCREEN_HEIGHT - CLIMBER_HEIGHT - 50
+        self.is_slipping[mask] = False
+        self.slip_timer[mask] = 0
+        self.balance_key_needed[mask] = 0
+        self.coconut_timer[mask] = 0
+        self.coconut_alive[mask] = False
+        self.coconut_head[mask] = 0
+        self.frames[mask] = 0
+        self.hits[mask] = 0
+        self.slips[mask] = 0
+
+    def _random(self, mask):
+        """Next uniform draw for every game; only games in mask consume it"""
+        z = _mix64_array(self.rng_key + self.rng_counter * np.uint64(_GOLDEN))
+        self.rng_counter += mask
+        return (z >> np.uint64(11)) * (1.0 / (1 << 53))
+
+    def step(self, keys):
+        """
+        Advance every game by one frame
+
+        Args:
+            keys: Bitmask of KEY_* inputs, either one int for all games or
+                an integer array with one entry per game
+        """
+        keys = np.broadcast_to(np.asarray(keys, dtype=np.uint8), (self.n,))
+        y = self.climber_y
+
+        # Key presses are handled before the frame is simulated
+        over = self.game_over | self.win
+        restart = over & (keys & KEY_R != 0)
+        if restart.any():
+            self.reset(restart)
+        balance = ~over & self.is_slipping & (keys & self.balance_key_needed != 0)
+        self.is_slipping[balance] = False
+        self.balance_key_needed[balance] = 0
+
+        active = ~(self.game_over | self.win)
+        self.frames += active
+
+        # Climbing mechanic
+        climb = active & (keys & KEY_UP != 0) & ~self.is_slipping
+        y[climb] -= self.climb_speed
+
+        # Random slipping mechanic
+        roll = active & ~self.is_slipping
+        slip = roll & (self._random(roll) < 0.01)
+        choice = self._random(slip)
+        self.is_slipping |= slip
+        self.balance_key_needed[slip] = np.where(choice[slip] < 0.5, KEY_A, KEY_D)
+        self.slips += slip
+
+        # Handle slipping
+        slipping = active & self.is_slipping
+        self.slip_timer[slipping] += 1
+        y[slipping] += self.slip_speed
+        falling = slipping & (self.slip_timer > 60)
+        y[falling] += self.fall_speed
+        recover = falling & (self.slip_timer > 90)
+        self.is_slipping[recover] = False
+        self.balance_key_needed[recover] = 0
+        self.slip_timer[recover] = 0
+
+        # Spawn coconuts
+        self.coconut_timer[active] += 1
+        due = active & (self.coconut_timer >= self.coconut_spawn_rate)
+        self.coconut_timer[due] = 0
+        spawn = due & (self._random(due) < 0.5)
+        spawn_x = (self._random(spawn) * (SCREEN_WIDTH + 1)).astype(np.int64)
+        if spawn.any():
+            rows = self.rows[spawn]
+            slot = self.coconut_head[spawn] % self.coconut_slots
+            self.coconut_x[rows, slot] = spawn_x[spawn]
+            self.coconut_y[rows, slot] = 0
+            self.coconut_alive[rows, slot] = True
+            self.coconut_head[spawn] += 1
+
+        # Update coconuts oldest first, since each hit moves the climber
+        left = self.climber_x
+        right = self.climber_x + CLIMBER_WIDTH
+        slots = self.coconut_slots
+        for age in range(slots):
+            slot = (self.coconut_head + age) % slots
+            live = active & self.coconut_alive[self.rows, slot]
+            if not live.any():
+                continue
+            rows = self.rows[live]
+            slot = slot[live]
+            cx = self.coconut_x[rows, slot]
+            cy = self.coconut_y[rows, slot] + self.coconut_speed
+            self.coconut_y[rows, slot] = cy
+            cy_top = y[rows]
+
+            # Check for collision with climber
+            hit = (left < cx) & (cx < right) & (cy_top < cy) & (cy < cy_top + CLIMBER_HEIGHT)
+            y[rows[hit]] += self.fall_speed * 5
+            self.hits[rows[hit]] += 1
+
+            # Remove coconuts that were hit or went off screen
+            self.coconut_alive[rows, slot] = ~(hit | (cy > SCREEN_HEIGHT))
+
+        # Constrain climber to pole
+        won = active & (y < self.pole_top)
+        y[won] = self.pole_top
+        self.win |= won
+        lost = active & (y > self.pole_bottom - CLIMBER_HEIGHT)
+        y[lost] = self.pole_bottom - CLIMBER_HEIGHT
+        self.game_over |= lost
+
+        # Update score based on height climbed
+        score = ((self.pole_bottom - y - CLIMBER_HEIGHT) / self.pole_height * 100).astype(np.int64)
+        self.score[active] = score[active]
+
+    def scalar_twin(self, index):
+        """PoleSim that plays the same game as entry index of a fresh batch"""
+        return PoleSim(rng=CounterRNG(self.seed, self.first_stream + index), params=self.params)
+
+    def game_state(self, index):
+        """State of one game in the same shape as PoleSim attributes"""
+        slots = [(self.coconut_head[index] + age) % self.coconut_slots for age in range(self.coconut_slots)]
+        balance_key = {KEY_A: 'A', KEY_D: 'D'}.get(int(self.balance_key_needed[index]))
+        return {
+            'game_over': bool(self.game_over[index]),
+            'win': bool(self.win[index]),
+            'score': int(self.score[index]),
+            'climber_y': int(self.climber_y[index]),
+            'is_slipping': bool(self.is_slipping[index]),
+            'slip_timer': int(self.slip_timer[index]),
+            'balance_key_needed': balance_key,
+            'coconut_timer': int(self.coconut_timer[index]),
+            'coconuts': [[int(self.coconut_x[index, s]), int(self.coconut_y[index, s])]
+                         for s in slots if self.coconut_alive[index, s]],
+        }
+
+
+def scalar_state(sim):
+    """State of a PoleSim in the shape returned by BatchSim.game_state"""
+    return {
+        'game_over': sim.game_over,
+        'win': sim.win,
+        'score': sim.score,
+        'climber_y': sim.climber_y,
+        'is_slipping': sim.is_slipping,
+        'slip_timer': sim.slip_timer,
+        'balance_key_needed': sim.balance_key_needed,
+        'coconut_timer': sim.coconut_timer,
+        'coconuts': sim.coconuts.to_list(),
+    }
+
+
+def verify(n=200, frames=3000, seed=0):
+    """Run a batch next to its scalar twins on random inputs and compare them"""
+    batch = BatchSim(n, seed)
+    twins = [batch.scalar_twin(i) for i in range(n)]
+    inputs = np.random.default_rng(seed)
+    choices = np.array([0, KEY_UP, KEY_UP | KEY_A, KEY_UP | KEY_D, KEY_R], dtype=np.uint8)
+    for frame in range(frames):
+        keys = inputs.choice(choices, size=n, p=[0.1, 0.5, 0.15, 0.15, 0.1])
+        batch.step(keys)
+        for i, twin in enumerate(twins):
+            twin.step(int(keys[i]))
+            if scalar_state(twin) != batch.game_state(i):
+                print(f"Mismatch in game {i} at frame {frame}")
+                return False
+    print(f"Batch matches scalar simulation for {n} games x {frames} frames")
+    return True
+
+
+def benchmark(n=100000, seed=0):
+    """Play n games to the end holding UP and balancing instantly"""
+    batch = BatchSim(n, seed)
+    keys = KEY_UP | KEY_A | KEY_D
+    start = time.perf_counter()
+    steps = 0
+    while not (batch.game_over | batch.win).all():
+        batch.step(keys)
+        steps += 1
+    elapsed = time.perf_counter() - start
+    print(f"{n} games finished in {steps} steps, {elapsed:.2f}s "
+          f"({int(batch.frames.sum() / elapsed)} game-frames/s)")
+    print(f"Win rate: {batch.win.mean():.1%}, mean hits per game: {batch.hits.mean():.2f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "verify":
+        sys.exit(0 if verify() else 1)
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,396 @@
+"""
+Reinforcement-learning style environments for Lissana Gaha Nagima.
+
+PoleEnv wraps one PoleSim and VecPoleEnv steps many games per call, following
+the Gymnasium API without depending on it:
+
+    obs, info = env.reset()
+    obs, reward, terminated, truncated, info = env.step(action)
+
+Actions are ACTION_NONE, ACTION_UP, ACTION_A and ACTION_D. Observations are
+float32 vectors of OBS_SIZE values:
+
+    0     climber_y / SCREEN_HEIGHT
+    1     1.0 while slipping
+    2     slip_timer / SLIP_RECOVER_FRAMES
+    3, 4  1.0 if A (resp. D) is the balance key needed
+    5...  (dx, dy, present) for the NEAREST_COCONUTS coconuts closest to the
+          climber's centre, nearest first, as fractions of the screen size
+
+The reward is the change in score (percent of the pole climbed) / 100, plus
+1 for reaching the top and -1 for falling off the bottom.
+
+VecPoleEnv splits its games between worker processes, each running a
+BatchSim over its slice. Actions and results are exchanged through shared
+memory, so a step only sends one short message per worker. Finished games are
+reset automatically. Game i of a VecPoleEnv plays the same game as
+PoleEnv(seed, index=i) given the same actions.
+
+    python pole_env.py verify
+    python pole_env.py benchmark --envs 65536 --workers 8
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from pole_batch import BatchSim, CounterRNG
+from pole_sim import (
+    PoleSim, SCREEN_WIDTH, SCREEN_HEIGHT, CLIMBER_WIDTH, KEY_UP, KEY_A, KEY_D,
+)
+
+ACTION_NONE = 0
+ACTION_UP = 1
+ACTION_A = 2
+ACTION_D = 3
+ACTION_NAMES = ('none', 'up', 'A', 'D')
+ACTION_KEYS = np.array([0, KEY_UP, KEY_A, KEY_D], dtype=np.uint8)
+
+NEAREST_COCONUTS = 2
+OBS_SIZE = 5 + 3 * NEAREST_COCONUTS
+SLIP_RECOVER_FRAMES = 90
+MAX_EPISODE_STEPS = 3600  # one minute of play at 60 steps per second
+
+# Arrays shared between VecPoleEnv and its workers: name, dtype, shape per game
+_BUFFERS = (
+    ('actions', np.uint8, ()),
+    ('obs', np.float32, (OBS_SIZE,)),
+    ('reward', np.float32, ()),
+    ('terminated', np.bool_, ()),
+    ('truncated', np.bool_, ()),
+    ('final_score', np.int64, ()),
+    ('final_win', np.bool_, ()),
+)
+
+
+def observe(out, climber_x, climber_y, is_slipping, slip_timer, balance_key, coconut_x, coconut_y,
+            coconut_alive):
+    """
+    Write observations for a batch of games into out
+
+    Args:
+        out: float32 array of shape (n, OBS_SIZE)
+        climber_x: Climber's left edge, shared by every game
+        climber_y, is_slipping, slip_timer, balance_key: Arrays of shape (n,);
+            balance_key holds KEY_A, KEY_D or 0
+        coconut_x, coconut_y, coconut_alive: Arrays of shape (n, slots)
+    """
+    out[:, 0] = climber_y / SCREEN_HEIGHT
+    out[:, 1] = is_slipping
+    out[:, 2] = slip_timer / SLIP_RECOVER_FRAMES
+    out[:, 3] = balance_key == KEY_A
+    out[:, 4] = balance_key == KEY_D
+
+    centre = climber_x + CLIMBER_WIDTH // 2
+    dx = (coconut_x - centre) / SCREEN_WIDTH
+    dy = (coconut_y - climber_y[:, None]) / SCREEN_HEIGHT
+    distance = np.where(coconut_alive, dx * dx + dy * dy, np.inf)
+    order = np.argsort(distance, axis=1, kind='stable')
+    for k in range(NEAREST_COCONUTS):
+        base = 5 + 3 * k
+        if k >= distance.shape[1]:
+            out[:, base:base + 3] = 0.0
+            continue
+        nearest = order[:, k:k + 1]
+        present = np.take_along_axis(coconut_alive, nearest, axis=1)[:, 0]
+        out[:, base] = np.where(present, np.take_along_axis(dx, nearest, axis=1)[:, 0], 0.0)
+        out[:, base + 1] = np.where(present, np.take_along_axis(dy, nearest, axis=1)[:, 0], 0.0)
+        out[:, base + 2] = present
+
+
+def _reward(score_before, score, win, game_over):
+    return (score - score_before) / 100.0 + win - game_over
+
+
+class PoleEnv:
+    """One game as an environment; call reset() after an episode ends"""
+
+    def __init__(self, seed=0, index=0, max_steps=MAX_EPISODE_STEPS):
+        """
+        Args:
+            seed: Seed of the game's CounterRNG
+            index: Random stream, matching game index of a VecPoleEnv
+            max_steps: Steps before an episode is truncated, or None
+        """
+        self.index = index
+        self.sim = PoleSim(rng=CounterRNG(seed, index))
+        self.max_steps = max_steps
+        self.steps = 0
+        self.obs = np.zeros((1, OBS_SIZE), dtype=np.float32)
+
+    def reset(self, seed=None):
+        if seed is not None:
+            self.sim.rng = CounterRNG(seed, self.index)
+        self.sim.reset()
+        self.steps = 0
+        return self._observe(), {}
+
+    def step(self, action):
+        sim = self.sim
+        score_before = sim.score
+        sim.step(int(ACTION_KEYS[action]))
+        self.steps += 1
+        terminated = sim.win or sim.game_over
+        truncated = not terminated and self.max_steps is not None and self.steps >= self.max_steps
+        reward = _reward(score_before, sim.score, sim.win, sim.game_over)
+        return self._observe(), reward, terminated, truncated, {'score': sim.score, 'win': sim.win}
+
+    def _observe(self):
+        sim = self.sim
+        # Spawn order, like BatchSim's slots, so ties break the same way
+        coconuts = np.array(sim.coconuts.to_list(), dtype=np.int64).reshape(1, len(sim.coconuts), 2)
+        key = {'A': KEY_A, 'D': KEY_D}.get(sim.balance_key_needed, 0)
+        observe(self.obs, sim.climber_x, np.array([sim.climber_y]), np.array([sim.is_slipping]),
+                np.array([sim.slip_timer]), np.array([key]), coconuts[:, :, 0], coconuts[:, :, 1],
+                np.ones(coconuts.shape[:2], dtype=bool))
+        return self.obs[0].copy()
+
+
+class BatchEnv:
+    """Environment over a BatchSim, writing results into caller-provided arrays"""
+
+    def __init__(self, n, seed=0, first_stream=0, max_steps=MAX_EPISODE_STEPS, buffers=None):
+        self.batch = BatchSim(n, seed, first_stream)
+        self.max_steps = max_steps
+        self.steps = np.zeros(n, dtype=np.int64)
+        if buffers is None:
+            buffers = {name: np.zeros((n,) + shape, dtype=dtype) for name, dtype, shape in _BUFFERS}
+        self.buffers = buffers
+
+    def reset(self):
+        self.batch.reset()
+        self.steps[:] = 0
+        self._observe()
+
+    def step(self, actions):
+        """Step every game, resetting those that finish, and fill the buffers"""
+        batch = self.batch
+        out = self.buffers
+        score_before = batch.score.copy()
+        batch.step(ACTION_KEYS[actions])
+        self.steps += 1
+
+        terminated = out['terminated']
+        truncated = out['truncated']
+        np.logical_or(batch.win, batch.game_over, out=terminated)
+        if self.max_steps is not None:
+            np.greater_equal(self.steps, self.max_steps, out=truncated)
+            truncated &= ~terminated
+        else:
+            truncated[:] = False
+        out['reward'][:] = _reward(score_before, batch.score, batch.win, batch.game_over)
+
+        done = terminated | truncated
+        out['final_score'][:] = batch.score
+        out['final_win'][:] = batch.win
+        if done.any():
+            batch.reset(done)
+            self.steps[done] = 0
+        self._observe()
+
+    def _observe(self):
+        batch = self.batch
+        # Present slots oldest first, which is the order PoleSim spawned them
+        slots = (batch.coconut_head[:, None] + np.arange(batch.coconut_x.shape[1])) % batch.coconut_x.shape[1]
+        observe(self.buffers['obs'], batch.climber_x, batch.climber_y, batch.is_slipping, batch.slip_timer,
+                batch.balance_key_needed, np.take_along_axis(batch.coconut_x, slots, axis=1),
+                np.take_along_axis(batch.coconut_y, slots, axis=1),
+                np.take_along_axis(batch.coconut_alive, slots, axis=1))
+
+
+def _views(blocks, n):
+    """Arrays over the shared memory blocks, one per _BUFFERS entry"""
+    return {name: np.ndarray((n,) + shape, dtype=dtype, buffer=block.buf)
+            for (name, dtype, shape), block in zip(_BUFFERS, blocks)}
+
+
+def _worker(conn, names, n, start, stop, seed, max_steps):
+    blocks = [shared_memory.SharedMemory(name=name) for name in names]
+    arrays = _views(blocks, n)
+    env = BatchEnv(stop - start, seed, start, max_steps,
+                   buffers={name: array[start:stop] for name, array in arrays.items()})
+    try:
+        while True:
+            command = conn.recv()
+            if command == 'step':
+                env.step(env.buffers['actions'])
+            elif command == 'reset':
+                env.reset()
+            else:
+                break
+            conn.send(None)
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        del env, arrays
+        for block in blocks:
+            block.close()
+
+
+class VecPoleEnv:
+    """
+    Many games stepped together, split across worker processes
+
+    The arrays returned by reset() and step() are views of shared memory that
+    the next call overwrites; copy them to keep them. info holds the score and
+    win flag each game had before any automatic reset.
+    """
+
+    def __init__(self, num_envs, seed=0, workers=None, max_steps=MAX_EPISODE_STEPS):
+        """
+        Args:
+            num_envs: Number of games
+            seed: Seed shared by every game; game i uses random stream i
+            workers: Worker processes; 0 steps every game in this process
+            max_steps: Steps before an episode is truncated, or None
+        """
+        self.num_envs = num_envs
+        if workers is None:
+            workers = min(os.cpu_count() or 1, max(1, num_envs // 1024))
+        self.blocks = []
+        self.conns = []
+        self.processes = []
+
+        if workers == 0:
+            self.local = BatchEnv(num_envs, seed, 0, max_steps)
+            self.buffers = self.local.buffers
+            return
+        self.local = None
+        for name, dtype, shape in _BUFFERS:
+            size = max(1, num_envs * int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize)
+            self.blocks.append(shared_memory.SharedMemory(create=True, size=size))
+        names = [block.name for block in self.blocks]
+        self.buffers = _views(self.blocks, num_envs)
+
+        bounds = np.linspace(0, num_envs, workers + 1).astype(int)
+        for start, stop in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_worker, daemon=True,
+                                              args=(child, names, num_envs, start, stop, seed, max_steps))
+            process.start()
+            child.close()
+            self.conns.append(parent)
+            self.processes.append(process)
+
+    def _broadcast(self, command):
+        for conn in self.conns:
+            conn.send(command)
+        for conn, process in zip(self.conns, self.processes):
+            # Forked siblings hold copies of the pipe, so a dead worker never
+            # shows up as EOF; check on it while waiting instead
+            while not conn.poll(1.0):
+                if not process.is_alive():
+                    raise RuntimeError(f"Environment worker exited with code {process.exitcode}")
+            conn.recv()
+
+    def reset(self):
+        if self.local is not None:
+            self.local.reset()
+        else:
+            self._broadcast('reset')
+        return self.buffers['obs'], {}
+
+    def step(self, actions):
+        buffers = self.buffers
+        buffers['actions'][:] = actions
+        if self.local is not None:
+            self.local.step(buffers['actions'])
+        else:
+            self._broadcast('step')
+        info = {'score': buffers['final_score'], 'win': buffers['final_win']}
+        return buffers['obs'], buffers['reward'], buffers['terminated'], buffers['truncated'], info
+
+    def close(self):
+        for conn in self.conns:
+            try:
+                conn.send('close')
+            except OSError:
+                pass
+        for process in self.processes:
+            process.join(timeout=5)
+        self.conns = []
+        self.processes = []
+        self.buffers = None
+        for block in self.blocks:
+            try:
+                block.close()
+            except BufferError:
+                pass  # arrays returned by step() are still alive; the mapping goes with them
+            block.unlink()
+        self.blocks = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def verify(n=64, steps=3000, seed=0, workers=2, max_steps=300):
+    """Step a VecPoleEnv next to scalar PoleEnvs on random actions and compare them"""
+    scalars = [PoleEnv(seed, i, max_steps) for i in range(n)]
+    actions = np.random.default_rng(seed)
+    truncations = 0
+    with VecPoleEnv(n, seed, workers=workers, max_steps=max_steps) as vec:
+        obs, _ = vec.reset()
+        expected = np.array([env.reset()[0] for env in scalars])
+        if not np.array_equal(obs, expected):
+            print("Mismatch after reset")
+            return False
+        for step in range(steps):
+            action = actions.choice(4, size=n, p=[0.1, 0.6, 0.15, 0.15])
+            obs, reward, terminated, truncated, _ = vec.step(action)
+            for i, env in enumerate(scalars):
+                o, r, term, trunc, _ = env.step(action[i])
+                if term or trunc:
+                    o, _ = env.reset()
+                if (not np.array_equal(o, obs[i]) or np.float32(r) != reward[i]
+                        or term != terminated[i] or trunc != truncated[i]):
+                    print(f"Mismatch in game {i} at step {step}")
+                    return False
+            truncations += int(truncated.sum())
+    print(f"Vectorized environment matches scalar environments for {n} games x {steps} steps "
+          f"({truncations} truncated episodes)")
+    return True
+
+
+def benchmark(num_envs, workers, seconds):
+    """Step random actions for about the given time and report the step rate"""
+    rng = np.random.default_rng(0)
+    actions = rng.integers(0, 4, size=(16, num_envs), dtype=np.uint8)
+    with VecPoleEnv(num_envs, workers=workers) as env:
+        env.reset()
+        calls = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            env.step(actions[calls % len(actions)])
+            calls += 1
+        elapsed = time.perf_counter() - start
+    rate = calls * num_envs / elapsed
+    print(f"{num_envs} envs, {workers} workers: {calls} calls in {elapsed:.2f}s, "
+          f"{rate:,.0f} steps/s ({rate * 60 / 1e6:.1f}M steps/min)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check or benchmark the vectorized environment")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('verify', help="compare vectorized and scalar environments")
+    bench = subparsers.add_parser('benchmark', help="measure environment steps per second")
+    bench.add_argument('--envs', type=int, default=16384, help="number of games")
+    bench.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                       help="worker processes; 0 steps in this process")
+    bench.add_argument('--seconds', type=float, default=5.0, help="how long to run")
+    args = parser.parse_args()
+
+    if args.command == 'verify':
+        return 0 if verify() else 1
+    benchmark(args.envs, args.workers, args.seconds)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+"""
+Headless simulation core for Lissana Gaha Nagima.
+
+Holds the game rules that used to live in Game.update, with no dependency on
+pygame. A PoleSim is advanced one frame at a time with step(keys), where keys
+is a bitmask of the inputs for that frame, and returns the list of events the
+frame produced so a front end can turn them into sounds and drawing.
+
+The pole can be several screens tall. Coordinates are in world pixels from
+the top of the pole's world, and coconuts only exist in a window around the
+climber: they fall in at the top of the screen-high view that follows the
+climber and are dropped once they leave it, so the work per step does not
+grow with the height of the pole.
+"""
+import hashlib
+import random
+
+import numpy as np
+
+from entities import ComponentPool
+
+# Constants
+SCREEN_WIDTH = 800
+SCREEN_HEIGHT = 600
+POLE_WIDTH = 40
+CLIMBER_WIDTH = 60
+CLIMBER_HEIGHT = 80
+COCONUT_SIZE = 30
+GRAVITY = 0.2
+CLIMB_SPEED = 2
+SLIP_SPEED = 1
+FALL_SPEED = 4
+COCONUT_SPEED = 3
+COCONUT_SPAWN_RATE = 60  # frames between coconut spawns
+COCONUT_WINDOW_MARGIN = 300  # coconuts this far above the view are dropped
+
+# Difficulty parameters a simulation can override; the constants above are
+# the defaults the game ships with
+DEFAULT_PARAMS = {
+    'climb_speed': CLIMB_SPEED,
+    'slip_speed': SLIP_SPEED,
+    'fall_speed': FALL_SPEED,
+    'coconut_speed': COCONUT_SPEED,
+    'coconut_spawn_rate': COCONUT_SPAWN_RATE,
+}
+
+# Input bits. UP is held, the others are key presses during the frame.
+KEY_UP = 1
+KEY_A = 2
+KEY_D = 4
+KEY_R = 8
+
+BALANCE_KEYS = ['A', 'D']
+BALANCE_KEY_BITS = {'A': KEY_A, 'D': KEY_D}
+
+# Events returned by PoleSim.step
+EVENT_RESET = 'reset'
+EVENT_CLIMB = 'climb'
+EVENT_SLIP = 'slip'
+EVENT_BALANCE = 'balance'
+EVENT_FALL = 'fall'
+EVENT_HIT = 'hit'
+EVENT_WIN = 'win'
+EVENT_GAME_OVER = 'game_over'
+
+
+class CoconutPool(ComponentPool):
+    """
+    Live coconuts stored as parallel arrays
+
+    Positions sit in x[:count] and y[:count]. Removal swaps the last coconut
+    into the freed slot, so the order is not stable; seq records spawn order
+    for the rules that depend on it. Storage doubles when full and is reused
+    afterwards, so a steady stream of coconuts does not allocate.
+    """
+
+    __slots__ = ('x', 'y', 'seq', 'next_seq')
+    fields = {'x': np.int64, 'y': np.int64, 'seq': np.int64}
+
+    def __init__(self, capacity=16):
+        super().__init__(capacity)
+        self.next_seq = 0
+
+    def clear(self):
+        self.count = 0
+        self.next_seq = 0
+
+    def spawn(self, x, y):
+        i = self.alloc()
+        self.x[i] = x
+        self.y[i] = y
+        self.seq[i] = self.next_seq
+        self.next_seq += 1
+
+    def positions(self):
+        """Views of the live x and y arrays, valid until the pool changes"""
+        return self.x[:self.count], self.y[:self.count]
+
+    def move(self, dy):
+        self.y[:self.count] += dy
+
+    def cull_below(self, limit):
+        """Remove every coconut whose y is greater than limit"""
+        self.cull_outside(None, limit)
+
+    def cull_outside(self, top, bottom):
+        """Remove every coconut whose y is less than top or greater than bottom"""
+        y = self.y[:self.count]
+        outside = y > bottom
+        if top is not None:
+            outside |= y < top
+        self.remove_where(outside)
+
+    def first_hit(self, left, right, top, bottom, after_seq=-1):
+        """
+        Index of the earliest-spawned coconut strictly inside the rectangle
+
+        Only coconuts spawned after after_seq are considered. Returns -1 when
+        none are inside.
+        """
+        n = self.count
+        if n == 0:
+            return -1
+        x = self.x[:n]
+        y = self.y[:n]
+        inside = (x > left) & (x < right) & (y > top) & (y < bottom)
+        if after_seq >= 0:
+            inside &= self.seq[:n] > after_seq
+        hits = np.flatnonzero(inside)
+        if len(hits) == 0:
+            return -1
+        if len(hits) == 1:
+            return int(hits[0])
+        return int(hits[np.argmin(self.seq[hits])])
+
+    def to_list(self):
+        """Live coconuts as [x, y] lists in spawn order"""
+        order = np.argsort(self.seq[:self.count], kind='stable')
+        return [[int(self.x[i]), int(self.y[i])] for i in order]
+
+
+def view_top(climber_y, world_height):
+    """
+    Top of the screen-high view that follows the climber
+
+    The view is centred on the climber and kept inside the world, so on a
+    one-screen pole it is always 0.
+    """
+    top = climber_y + CLIMBER_HEIGHT // 2 - SCREEN_HEIGHT // 2
+    return min(max(top, 0), world_height - SCREEN_HEIGHT)
+
+
+def difficulty(params=None):
+    """DEFAULT_PARAMS with the given overrides applied; every value must be a positive int"""
+    params = dict(params or {})
+    unknown = set(params) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown difficulty parameters: {', '.join(sorted(unknown))}")
+    for name, value in params.items():
+        if not isinstance(value, int) or value < 1:
+            raise ValueError(f"{name} must be a positive integer, got {value!r}")
+    return {**DEFAULT_PARAMS, **params}
+
+
+class PoleSim:
+    """State and rules of a single climb, stepped one frame at a time"""
+
+    def __init__(self, rng=None, params=None, pole_screens=1):
+        # Anything with random(), choice() and randint() works; the global
+        # random module is used when no generator is given.
+        self.rng = rng if rng is not None else random
+        if pole_screens < 1:
+            raise ValueError(f"pole_screens must be at least 1, got {pole_screens}")
+        self.pole_screens = pole_screens
+        self.world_height = SCREEN_HEIGHT * pole_screens
+        self.params = difficulty(params)
+        self.climb_speed = self.params['climb_speed']
+        self.slip_speed = self.params['slip_speed']
+        self.fall_speed = self.params['fall_speed']
+        self.coconut_speed = self.params['coconut_speed']
+        self.coconut_spawn_rate = self.params['coconut_spawn_rate']
+        self.coconuts = CoconutPool()
+        self.reset()
+
+    def reset(self):
+        self.game_over = False
+        self.win = False
+        self.score = 0
+        self.pole_top = 50  # Top of the pole position
+        self.pole_bottom = self.world_height - 50  # Bottom of the pole position
+        self.pole_height = self.pole_bottom - self.pole_top
+
+        # Climber properties
+        self.climber_x = SCREEN_WIDTH // 2 - CLIMBER_WIDTH // 2
+        self.climber_y = self.world_height - CLIMBER_HEIGHT - 50
+        self.is_slipping = False
+        self.slip_timer = 0
+        self.balance_key_needed = None
+        self.coconuts.clear()
+        self.coconut_timer = 0
+
+    def window_top(self):
+        """Top of the view around the climber, where coconuts fall in"""
+        return view_top(self.climber_y, self.world_height)
+
+    def state_hash(self):
+        """SHA-256 digest of the game state, for checking replays"""
+        state = (
+            self.game_over, self.win, self.score, self.climber_x, self.climber_y,
+            self.is_slipping, self.slip_timer, self.balance_key_needed,
+            self.coconut_timer, self.coconuts.to_list(),
+        )
+        return hashlib.sha256(repr(state).encode()).digest()
+
+    def step(self, keys):
+        """
+        Advance the game by one frame
+
+        Args:
+            keys: Bitmask of KEY_* inputs for this frame
+
+        Returns:
+            List of EVENT_* strings produced during the frame
+        """
+        events = []
+
+        # Key presses are handled before the frame is simulated
+        if self.game_over or self.win:
+            if keys & KEY_R:
+                self.reset()
+                events.append(EVENT_RESET)
+        elif self.is_slipping and keys & BALANCE_KEY_BITS[self.balance_key_needed]:
+            # Balance mechanic
+            self.is_slipping = False
+            self.balance_key_needed = None
+            events.append(EVENT_BALANCE)
+
+        if self.game_over or self.win:
+            return events
+
+        rng = self.rng
+
+        # Climbing mechanic
+        if keys & KEY_UP and not self.is_slipping:
+            self.climber_y -= self.climb_speed
+            events.append(EVENT_CLIMB)
+
+        # Random slipping mechanic
+        if not self.is_slipping and rng.random() < 0.01:
+            self.is_slipping = True
+            self.balance_key_needed = rng.choice(BALANCE_KEYS)
+            events.append(EVENT_SLIP)
+
+        # Handle slipping
+        if self.is_slipping:
+            self.slip_timer += 1
+            self.climber_y += self.slip_speed
+
+            # If player doesn't balance in time, they fall
+            if self.slip_timer > 60:  # 1 second at 60 FPS
+                self.climber_y += self.fall_speed
+                events.append(EVENT_FALL)
+
+                # Reset slip state after falling for a bit
+                if self.slip_timer > 90:
+                    self.is_slipping = False
+                    self.balance_key_needed = None
+                    self.slip_timer = 0
+
+        # Spawn coconuts
+        self.coconut_timer += 1
+        if self.coconut_timer >= self.coconut_spawn_rate:
+            self.coconut_timer = 0
+            if rng.random() < 0.5:  # 50% chance to spawn a coconut
+                coconut_x = rng.randint(0, SCREEN_WIDTH)
+                self.coconuts.spawn(coconut_x, self.window_top())
+
+        # Update coconuts
+        coconuts = self.coconuts
+        coconuts.move(self.coconut_speed)
+
+        # Check for collision with climber. Each hit knocks the climber down,
+        # so coconuts are tested in spawn order against the moved climber.
+        last_hit = -1
+        while True:
+            i = coconuts.first_hit(self.climber_x, self.climber_x + CLIMBER_WIDTH,
+                                   self.climber_y, self.climber_y + CLIMBER_HEIGHT, last_hit)
+            if i < 0:
+                break
+            last_hit = int(coconuts.seq[i])
+            coconuts.remove(i)
+            self.climber_y += self.fall_speed * 5  # Fall a significant amount
+            events.append(EVENT_HIT)
+
+        # Remove coconuts that go off screen. On a tall pole that includes
+        # ones left far above the view when the climber falls away from them.
+        top = self.window_top()
+        coconuts.cull_outside(top - COCONUT_WINDOW_MARGIN, top + SCREEN_HEIGHT)
+
+        # Keep climber on the pole
+        pole_center = SCREEN_WIDTH // 2
+        self.climber_x = pole_center - CLIMBER_WIDTH // 2
+
+        # Constrain climber to pole
+        if self.climber_y < self.pole_top:
+            self.climber_y = self.pole_top
+            self.win = True
+            events.append(EVENT_WIN)
+        elif self.climber_y > self.pole_bottom - CLIMBER_HEIGHT:
+            self.climber_y = self.pole_bottom - CLIMBER_HEIGHT
+            self.game_over = True
+            events.append(EVENT_GAME_OVER)
+
+        # Update score based on height climbed
+        self.score = int((self.pole_bottom - self.climber_y - CLIMBER_HEIGHT) / self.pole_height * 100)
+
+        return events
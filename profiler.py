@@ -0,0 +1,196 @@
+"""
+Frame profiler for Lissana Gaha Nagima.
+
+The game loop calls Profiler.lap(phase) after each phase of a frame and
+end_frame() once the frame is done. Each lap records one span (phase, start,
+duration) in a fixed-size ring buffer and adds the duration to the current
+frame's per-phase totals, which are kept in a second ring. Nothing is
+allocated per frame.
+
+The recorded spans can be exported in Chrome's trace-event JSON format and
+opened in chrome://tracing or https://ui.perfetto.dev.
+"""
+import gc
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pygame
+
+PHASE_EVENTS = 0
+PHASE_UPDATE = 1
+PHASE_SOUND = 2
+PHASE_DRAW = 3
+PHASE_PRESENT = 4
+PHASE_WAIT = 5
+PHASE_NAMES = ('handle_events', 'update', 'sound', 'draw', 'present', 'wait')
+PHASE_COLORS = (
+    (200, 200, 200),
+    (80, 160, 255),
+    (255, 200, 0),
+    (80, 220, 80),
+    (255, 80, 80),
+    (90, 90, 90),
+)
+
+
+class Profiler:
+    """Records phase timings into ring buffers"""
+
+    def __init__(self, max_frames=1024, max_spans=16384):
+        self.clock = time.perf_counter_ns
+        self.origin = self.clock()
+        self.last = self.origin
+
+        self.span_phase = np.zeros(max_spans, dtype=np.int8)
+        self.span_start = np.zeros(max_spans, dtype=np.int64)
+        self.span_duration = np.zeros(max_spans, dtype=np.int64)
+        self.span_count = 0
+
+        self.frame_start = np.zeros(max_frames, dtype=np.int64)
+        self.frame_phases = np.zeros((max_frames, len(PHASE_NAMES)), dtype=np.int64)
+        self.frame_count = 0
+        self.frame_start[0] = self.origin
+
+    def lap(self, phase):
+        """Charge the time since the previous lap to phase"""
+        now = self.clock()
+        duration = now - self.last
+        i = self.span_count % len(self.span_start)
+        self.span_phase[i] = phase
+        self.span_start[i] = self.last
+        self.span_duration[i] = duration
+        self.span_count += 1
+        self.frame_phases[self.frame_count % len(self.frame_start), phase] += duration
+        self.last = now
+
+    def end_frame(self):
+        self.frame_count += 1
+        row = self.frame_count % len(self.frame_start)
+        self.frame_start[row] = self.last
+        self.frame_phases[row] = 0
+
+    def recent_frames(self, count):
+        """Per-phase durations (ns) of up to count completed frames, oldest first"""
+        count = min(count, self.frame_count, len(self.frame_start) - 1)
+        rows = (self.frame_count - count + np.arange(count)) % len(self.frame_start)
+        return self.frame_phases[rows]
+
+    def trace_events(self, seconds=None):
+        """Recorded spans as Chrome trace events, limited to the last seconds if given"""
+        count = min(self.span_count, len(self.span_start))
+        rows = (self.span_count - count + np.arange(count)) % len(self.span_start)
+        starts = self.span_start[rows]
+        if seconds is not None:
+            keep = starts >= self.last - int(seconds * 1e9)
+            rows = rows[keep]
+            starts = starts[keep]
+        events = [{'name': 'process_name', 'ph': 'M', 'pid': os.getpid(),
+                   'args': {'name': 'Lissana Gaha Nagima'}}]
+        for phase, start, duration in zip(self.span_phase[rows].tolist(), starts.tolist(),
+                                          self.span_duration[rows].tolist()):
+            events.append({
+                'name': PHASE_NAMES[phase],
+                'cat': 'frame',
+                'ph': 'X',
+                'ts': (start - self.origin) / 1000.0,
+                'dur': duration / 1000.0,
+                'pid': os.getpid(),
+                'tid': 0,
+            })
+        return events
+
+    def dump_trace(self, path, seconds=None):
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': self.trace_events(seconds), 'displayTimeUnit': 'ms'}, f)
+        return path
+
+
+class GCMonitor:
+    """
+    Counts garbage collections, the time they pause the program and the
+    number of memory blocks Python has allocated
+
+    A loop that allocates nothing per frame leaves allocated_blocks() flat and
+    triggers no collections.
+    """
+
+    def __init__(self):
+        self.clock = time.perf_counter_ns
+        self.started = None
+        self.reset()
+        gc.callbacks.append(self._callback)
+
+    def reset(self):
+        self.collections = [0] * len(gc.get_count())
+        self.pause_ns = 0
+        self.max_pause_ns = 0
+        self.blocks_start = sys.getallocatedblocks()
+
+    def _callback(self, phase, info):
+        if phase == 'start':
+            self.started = self.clock()
+        elif self.started is not None:
+            pause = self.clock() - self.started
+            self.collections[info['generation']] += 1
+            self.pause_ns += pause
+            self.max_pause_ns = max(self.max_pause_ns, pause)
+            self.started = None
+
+    def allocated_blocks(self):
+        """Blocks allocated now minus at the last reset"""
+        return sys.getallocatedblocks() - self.blocks_start
+
+    def close(self):
+        gc.callbacks.remove(self._callback)
+
+    def stats(self):
+        return {
+            'collections': list(self.collections),
+            'pause_ms': round(self.pause_ns / 1e6, 3),
+            'max_pause_us': round(self.max_pause_ns / 1e3, 1),
+            'allocated_blocks': self.allocated_blocks(),
+        }
+
+
+def draw_overlay(surface, font, profiler, coconut_count, graph_frames=180):
+    """
+    Draw the profiler overlay in the top-right corner and return its rect
+
+    Shows a frame-time graph with a 16.7 ms guide line, the average time per
+    phase over the graphed frames as stacked bars, and the live coconut count.
+    """
+    width, height = graph_frames + 20, 210
+    rect = pygame.Rect(surface.get_width() - width - 10, 40, width, height)
+    panel = surface.subsurface(rect)
+    panel.fill((0, 0, 0))
+
+    frames = profiler.recent_frames(graph_frames)
+    if len(frames):
+        totals_ms = frames.sum(axis=1) / 1e6
+        scale = 80 / 33.3  # graph height covers 0-33 ms
+        base = 90
+        for x, ms in enumerate(totals_ms.tolist()):
+            bar = min(int(ms * scale), 80)
+            color = (80, 220, 80) if ms <= 16.7 else (255, 80, 80)
+            pygame.draw.line(panel, color, (10 + x, base), (10 + x, base - bar))
+        guide = base - int(16.7 * scale)
+        pygame.draw.line(panel, (120, 120, 120), (10, guide), (10 + graph_frames, guide))
+
+        # Per-phase averages as one stacked bar plus a legend
+        means_ms = frames.mean(axis=0) / 1e6
+        x = 10
+        for phase, ms in enumerate(means_ms.tolist()):
+            span = int(ms * graph_frames / 33.3)
+            pygame.draw.rect(panel, PHASE_COLORS[phase], (x, 100, span, 10))
+            x += span
+        for phase, ms in enumerate(means_ms.tolist()):
+            label = font.render(f"{PHASE_NAMES[phase]} {ms:.2f} ms", True, PHASE_COLORS[phase])
+            panel.blit(label, (10, 116 + phase * 14))
+        footer = f"{totals_ms[-1]:.1f} ms/frame  coconuts: {coconut_count}"
+    else:
+        footer = f"coconuts: {coconut_count}"
+    panel.blit(font.render(footer, True, (255, 255, 255)), (10, 8))
+    return rect
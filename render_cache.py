@@ -0,0 +1,134 @@
+"""
+Surface caches for the Lissana Gaha Nagima renderer.
+"""
+from collections import OrderedDict
+
+import pygame
+
+
+class TextCache:
+    """
+    Bounded LRU cache of rendered text surfaces
+
+    Surfaces are keyed by (text, color, font), so text that does not change
+    between frames is rendered once and reused. hits and misses count lookups
+    to show how well the cache is working.
+    """
+
+    def __init__(self, maxsize=128, antialias=True):
+        self.maxsize = maxsize
+        self.antialias = antialias
+        self.surfaces = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.surfaces)
+
+    def render(self, font, text, color):
+        """Return the surface for text in color, rendering it on a miss"""
+        key = (text, color, font)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+
+        self.misses += 1
+        surface = font.render(text, self.antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.maxsize:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def clear(self):
+        self.surfaces.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups else 0.0
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self.surfaces),
+            'maxsize': self.maxsize,
+            'hit_rate': hit_rate,
+        }
+
+
+class ChunkCache:
+    """
+    Bounded LRU cache of horizontal strips of a scene too tall to keep whole
+
+    Strip index covers rows index * height to (index + 1) * height, for count
+    strips. render is
+    called as render(index, surface) to paint a strip the first time it is
+    needed; once maxsize strips are held, the least recently used one is
+    evicted and its surface repainted for the new strip, so memory stays the
+    same however tall the scene is.
+    """
+
+    def __init__(self, size, count, render, maxsize=6):
+        self.width, self.height = size
+        self.count = count
+        self.render = render
+        self.maxsize = maxsize
+        self.chunks = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def get(self, index):
+        """Return the surface for strip index, painting it on a miss"""
+        surface = self.chunks.get(index)
+        if surface is not None:
+            self.hits += 1
+            self.chunks.move_to_end(index)
+            return surface
+
+        self.misses += 1
+        if len(self.chunks) >= self.maxsize:
+            _, surface = self.chunks.popitem(last=False)
+            self.evictions += 1
+        else:
+            surface = pygame.Surface((self.width, self.height))
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert()
+        self.render(index, surface)
+        self.chunks[index] = surface
+        return surface
+
+    def draw(self, target, top, prefetch=1):
+        """
+        Blit the strips covering the rows from top down onto target
+
+        The prefetch strips above and below are painted too, so scrolling
+        into them later does not stall a frame. maxsize must leave room for
+        them as well as the strips on screen.
+        """
+        first = top // self.height
+        last = (top + target.get_height() - 1) // self.height
+        for index in range(max(first - prefetch, 0), first):
+            self.get(index)
+        for index in range(last + 1, min(last + 1 + prefetch, self.count)):
+            self.get(index)
+        for index in range(first, last + 1):
+            target.blit(self.get(index), (0, index * self.height - top))
+
+    def clear(self):
+        self.chunks.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        hit_rate = self.hits / lookups if lookups else 0.0
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self.chunks),
+            'maxsize': self.maxsize,
+            'hit_rate': hit_rate,
+        }
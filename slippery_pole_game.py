@@ -1,29 +1,46 @@
-import pygame
+from startup_profile import timer as startup  # first, so every import is timed
+
+import argparse
+import gc
+import itertools
 import random
 import sys
 import os
+import time
 
-# Initialize pygame
-pygame.init()
+# pygame.pkgdata imports pkg_resources when it can, which takes about as long
+# as the rest of pygame; without it pygame reads its bundled font directly.
+# The block only lasts for the import, so other modules can still use it.
+_block_pkg_resources = 'pkg_resources' not in sys.modules
+if _block_pkg_resources:
+    sys.modules['pkg_resources'] = None
 try:
-    pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
-    print("Pygame mixer initialized successfully")
-except Exception as e:
-    print(f"Warning: Could not initialize sound system: {e}")
-
-# Constants
-SCREEN_WIDTH = 800
-SCREEN_HEIGHT = 600
-POLE_WIDTH = 40
-CLIMBER_WIDTH = 60
-CLIMBER_HEIGHT = 80
-COCONUT_SIZE = 30
-GRAVITY = 0.2
-CLIMB_SPEED = 2
-SLIP_SPEED = 1
-FALL_SPEED = 4
-COCONUT_SPEED = 3
-COCONUT_SPAWN_RATE = 60  # frames between coconut spawns
+    import pygame
+finally:
+    if _block_pkg_resources:
+        del sys.modules['pkg_resources']
+startup.mark('import pygame and NumPy')
+
+from asset_cache import (
+    AssetCache, display_pixel_format, MIXER_FREQUENCY, MIXER_SIZE, MIXER_CHANNELS, MIXER_BUFFER,
+    MIXER_FORMAT,
+)
+from entities import ParticlePool, update_particles
+from frame_capture import FrameWriter, capture_surface
+from pole_sim import (
+    PoleSim, view_top, SCREEN_WIDTH, SCREEN_HEIGHT, POLE_WIDTH, CLIMBER_WIDTH, CLIMBER_HEIGHT,
+    COCONUT_SIZE, KEY_UP, KEY_A, KEY_D, KEY_R, EVENT_CLIMB, EVENT_SLIP, EVENT_BALANCE,
+    EVENT_RESET, EVENT_FALL, EVENT_HIT, EVENT_WIN,
+)
+from input_log import InputLog, new_seed, MAX_SEED, MAX_POLE_SCREENS
+from profiler import (
+    Profiler, draw_overlay, PHASE_EVENTS, PHASE_UPDATE, PHASE_SOUND, PHASE_DRAW,
+    PHASE_PRESENT, PHASE_WAIT,
+)
+from render_cache import ChunkCache, TextCache
+from sound_dispatcher import SoundDispatcher
+from sprite_atlas import SpriteAtlas, circle_sprite, rect_sprite
+startup.mark('import game modules')
 
 # Colors
 WHITE = (255, 255, 255)
@@ -33,91 +50,193 @@ GREEN = (0, 128, 0)
 RED = (255, 0, 0)
 BLUE = (0, 0, 255)
 
+# Timing
+SIM_RATE = 60  # simulation steps per second; all speeds are per step
+STEP_TIME = 1.0 / SIM_RATE
+MAX_CATCH_UP_STEPS = 5  # steps per rendered frame before dropping time
+
+# Tall poles are drawn from strips of background and pole this high. It must
+# divide SCREEN_HEIGHT so the one-screen images repeat seamlessly.
+CHUNK_HEIGHT = SCREEN_HEIGHT // 2
+
+# Sound: mixer channels reserved per group, and the most voices at once
+SOUND_GROUPS = {'movement': 2, 'impact': 2, 'jingle': 1}
+MAX_VOICES = 4
+
+# Effect name: (channel group, cooldown in ms). The cooldowns keep held-down
+# climbing and falling from retriggering their sounds every step.
+SOUND_EFFECTS = {
+    'climb': ('movement', 330),
+    'slip': ('movement', 150),
+    'fall': ('impact', 170),
+    'hit': ('impact', 100),
+    'win': ('jingle', 0),
+}
+EVENT_EFFECTS = {
+    EVENT_CLIMB: 'climb',
+    EVENT_SLIP: 'slip',
+    EVENT_BALANCE: 'slip',
+    EVENT_FALL: 'fall',
+    EVENT_HIT: 'hit',
+    EVENT_WIN: 'win',
+}
+
+# Coconut shell fragments thrown out when a coconut hits the climber
+HIT_PARTICLES = 12
+PARTICLE_SPEED = 4  # pixels per step
+PARTICLE_LIFE = 30  # steps
+PARTICLE_SIZE = 4
+
+# Profiler
+TRACE_SECONDS = 10  # how much history F4 writes to the trace file
+
 class Game:
-    def __init__(self):
+    def __init__(self, dirty_rects=False, fps=60, uncapped=False, seed=None, record=None,
+                 profile=False, pole_screens=1, defer_audio=False, profile_startup=False,
+                 offscreen=False, capture=None):
+        # Only the subsystems the game uses are started, rather than pygame.init()
+        pygame.display.init()
+        pygame.font.init()
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Lissana Gaha Nagima")
+        # Off-screen, frames are drawn into a surface that is never presented
+        self.present = not offscreen
+        if offscreen:
+            self.screen = capture_surface((SCREEN_WIDTH, SCREEN_HEIGHT))
         self.clock = pygame.time.Clock()
-        self.font = pygame.font.SysFont(None, 36)
-        self.load_assets()
+        # Font(None) is the default font SysFont(None) falls back to, without
+        # SysFont's scan of the system's fonts
+        self.font = pygame.font.Font(None, 36)
+        self.text_cache = TextCache()
+        startup.mark('init display and fonts')
+        self.mixer_started = False
+        self.load_images()
+        startup.mark('load images')
+        
+        # Each game gets its own seeded RNG so a session can be replayed
+        self.seed = seed if seed is not None else new_seed()
+        self.sim = PoleSim(rng=random.Random(self.seed), pole_screens=pole_screens)
+        self.record_path = record
+        self.input_log = InputLog(self.seed, pole_screens=pole_screens) if record else None
+        # NumPy only takes non-negative seeds, but random.Random takes any int
+        self.particles = ParticlePool(seed=self.seed & (2 ** 64 - 1))
+        self.build_scene()
+        startup.mark('build scene')
+        
+        # Silent until start_audio(); with defer_audio, run() calls it once
+        # the first frame is shown
+        self.sounds = SoundDispatcher(SOUND_GROUPS, max_voices=MAX_VOICES)
+        self.audio_started = False
+        if not defer_audio:
+            self.start_audio()
+        self.profile_startup = profile_startup
+        self.first_frame_shown = False
+        
+        # Rendered frames are copied to a writer thread; if it falls behind
+        # the disk, frames are dropped rather than stalling the game
+        self.capture_path = capture
+        # One frame per simulation step whatever the render rate, so the
+        # footage plays back at SIM_RATE
+        self.capture = FrameWriter(capture, (SCREEN_WIDTH, SCREEN_HEIGHT), SIM_RATE) if capture else None
+
+        # Dirty-rect mode only pushes the regions that changed since last frame
+        self.dirty_rects = dirty_rects
+        self.full_redraw = True
+        self.drawn_rects = []
+        
+        # Render rate is independent of SIM_RATE; uncapped renders as fast as possible
+        self.fps = fps
+        self.uncapped = uncapped
+        
+        # The profiler only exists once enabled; F3 toggles its overlay
+        self.profiler = Profiler() if profile else None
+        self.profiler_font = None
+        self.show_profiler = profile
         self.reset_game()
 
-    def load_assets(self):
+    def init_mixer(self):
+        """
+        Start the mixer, once; failing leaves the game silent
+
+        SDL subsystems are started as they are needed, and the mixer only once
+        the first frame is on screen.
+        """
+        if self.mixer_started:
+            return
+        self.mixer_started = True
+        try:
+            pygame.mixer.init(frequency=MIXER_FREQUENCY, size=MIXER_SIZE, channels=MIXER_CHANNELS,
+                              buffer=MIXER_BUFFER)
+            print("Pygame mixer initialized successfully")
+        except Exception as e:
+            print(f"Warning: Could not initialize sound system: {e}")
+
+    def load_images(self):
         # Get the absolute path to the assets directory
         current_dir = os.path.dirname(os.path.abspath(__file__))
         assets_dir = os.path.join(current_dir, 'assets')
+        self.assets_dir = assets_dir
         print(f"Loading assets from: {assets_dir}")
         
-        # Load images
-        # Use placeholder colors if images aren't available
-        try:
-            self.background = pygame.image.load(os.path.join(assets_dir, 'background.png')).convert()
-            self.background = pygame.transform.scale(self.background, (SCREEN_WIDTH, SCREEN_HEIGHT))
-            print("Successfully loaded background image")
-        except Exception as e:
-            print(f"Could not load background image: {e}")
-            self.background = None
-            
-        try:
-            self.pole_img = pygame.image.load(os.path.join(assets_dir, 'pole.png')).convert_alpha()
-            self.pole_img = pygame.transform.scale(self.pole_img, (POLE_WIDTH, SCREEN_HEIGHT))
-            print("Successfully loaded pole image")
-        except Exception as e:
-            print(f"Could not load pole image: {e}")
-            self.pole_img = None
-            
-        try:
-            self.climber_img = pygame.image.load(os.path.join(assets_dir, 'climber.png')).convert_alpha()
-            self.climber_img = pygame.transform.scale(self.climber_img, (CLIMBER_WIDTH, CLIMBER_HEIGHT))
-            print("Successfully loaded climber image")
-        except Exception as e:
-            print(f"Could not load climber image: {e}")
-            self.climber_img = None
-            
+        # Images and sounds come pre-scaled and pre-decoded from the asset cache.
+        # Anything missing is left as None and drawn with placeholder shapes.
+        pixel_format = display_pixel_format(self.screen)
+        cache = AssetCache(assets_dir, pixel_format=pixel_format, mixer_format=MIXER_FORMAT)
+        header = cache.read_header()
+        current = cache.is_current(header, sounds=False)
+        if current:
+            # The device may not grant MIXER_FORMAT; load_sounds() checks the
+            # sounds once the mixer is up
+            cache = AssetCache(assets_dir, pixel_format=pixel_format,
+                               mixer_format=header['settings'].get('mixer_format'))
+        else:
+            # Rebuilding the cache decodes the sounds, so the mixer can't wait
+            self.init_mixer()
+            cache = AssetCache(assets_dir, pixel_format=pixel_format, mixer_format=pygame.mixer.get_init())
         try:
-            self.coconut_img = pygame.image.load(os.path.join(assets_dir, 'coconut.png')).convert_alpha()
-            self.coconut_img = pygame.transform.scale(self.coconut_img, (COCONUT_SIZE, COCONUT_SIZE))
-            print("Successfully loaded coconut image")
+            images, _ = cache.load(sounds=False, checked=current)
         except Exception as e:
-            print(f"Could not load coconut image: {e}")
-            self.coconut_img = None
+            print(f"Could not load asset cache: {e}")
+            images = {}
+        self.asset_cache = cache
+        print(f"Loaded images: {', '.join(images) or 'none'}")
         
-        # Re-initialize mixer with explicit settings
-        pygame.mixer.quit()
-        pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
-        print("Re-initialized pygame mixer")
+        self.background = images.get('background')
+        self.pole_img = images.get('pole')
+        self.climber_img = images.get('climber')
+        self.coconut_img = images.get('coconut')
+
+    def load_sounds(self):
+        """Make the sound effects from the asset cache, or synthesize placeholders"""
+        sounds = {}
+        mixer_format = pygame.mixer.get_init()
+        if mixer_format and self.asset_cache.header is not None:
+            try:
+                cache = self.asset_cache
+                if list(mixer_format) == cache.mixer_format and cache.is_current(cache.header):
+                    sounds = cache.load_sounds()
+                else:
+                    # The sounds were packed for another mixer format, or are out of date
+                    cache = AssetCache(self.assets_dir, pixel_format=self.asset_cache.pixel_format,
+                                       mixer_format=mixer_format)
+                    _, sounds = cache.load()
+            except Exception as e:
+                print(f"Could not load sounds from asset cache: {e}")
+        print(f"Loaded sounds: {', '.join(sounds) or 'none'}")
         
         # Create default sound objects
         self.climb_sound = None
         self.slip_sound = None
-        self.fall_sound = None
+        self.fall_sound = sounds.get('fall')
         self.hit_sound = None
-        self.win_sound = None
-        
-        # List files in assets directory
-        print("Files in assets directory:")
-        for file in os.listdir(assets_dir):
-            if not file.endswith(":Zone.Identifier"):  # Skip Windows metadata files
-                print(f"  - {file}")
-        
-        # Load each sound file individually with explicit error handling
-        try:
-            if os.path.exists(os.path.join(assets_dir, 'fall.wav')):
-                self.fall_sound = pygame.mixer.Sound(os.path.join(assets_dir, 'fall.wav'))
-                self.fall_sound.set_volume(0.5)
-                print("Successfully loaded fall.wav")
-        except Exception as e:
-            print(f"Error loading fall.wav: {e}")
-            
-        try:
-            if os.path.exists(os.path.join(assets_dir, 'win.wav')):
-                self.win_sound = pygame.mixer.Sound(os.path.join(assets_dir, 'win.wav'))
-                self.win_sound.set_volume(0.5)
-                print("Successfully loaded win.wav")
-        except Exception as e:
-            print(f"Error loading win.wav: {e}")
+        self.win_sound = sounds.get('win')
+        for sound in sounds.values():
+            sound.set_volume(0.5)
             
-        # Create placeholder sounds for missing files
+        # Create placeholder sounds for missing files. Synthesized buffers are
+        # cached on disk, so only the first run pays for rendering them.
+        from synth import Synth, CACHE_DIRNAME
+        self.synth = Synth(cache_dir=os.path.join(self.assets_dir, CACHE_DIRNAME))
         if not self.climb_sound:
             print("Creating placeholder for climb sound")
             self.climb_sound = self.create_placeholder_sound(frequency=440, duration=100)
@@ -129,219 +248,427 @@ class Game:
         if not self.hit_sound:
             print("Creating placeholder for hit sound")
             self.hit_sound = self.create_placeholder_sound(frequency=110, duration=300)
-            
+
+        # Simulation events queue effects; the dispatcher plays them once per frame
+        self.sounds = SoundDispatcher(SOUND_GROUPS, max_voices=MAX_VOICES)
+        effect_sounds = {
+            'climb': self.climb_sound,
+            'slip': self.slip_sound,
+            'fall': self.fall_sound,
+            'hit': self.hit_sound,
+            'win': self.win_sound,
+        }
+        for name, (group, cooldown_ms) in SOUND_EFFECTS.items():
+            self.sounds.add(name, effect_sounds[name], group, cooldown_ms)
+
+    def start_audio(self):
+        """Start the mixer and load the sounds; run() defers this past the first frame"""
+        self.init_mixer()
+        startup.mark('init mixer')
+        self.load_sounds()
+        self.audio_started = True
+        startup.mark('load sounds')
+
     def create_placeholder_sound(self, frequency=440, duration=100):
-        """Create a simple placeholder sound using numpy if available, otherwise return None"""
+        """Create a simple placeholder tone with the synth, or return None if it can't be played"""
+        spec = {'duration_ms': duration, 'layers': [{'type': 'sine', 'freq': frequency, 'volume': 1.0}]}
         try:
-            import numpy as np
-            sample_rate = 44100
-            t = np.linspace(0, duration/1000, int(duration * sample_rate/1000), False)
-            tone = np.sin(frequency * 2 * np.pi * t)
-            tone = np.asarray([32767 * tone, 32767 * tone]).T.astype(np.int16)
-            buffer = pygame.sndarray.make_sound(tone)
-            buffer.set_volume(0.5)
-            return buffer
-        except ImportError:
-            print("Numpy not available for placeholder sounds")
-            return None
+            sound = self.synth.make_sound(spec)
         except Exception as e:
             print(f"Error creating placeholder sound: {e}")
             return None
+        if sound:
+            sound.set_volume(0.5)
+        return sound
 
     def reset_game(self):
-        self.game_over = False
-        self.win = False
-        self.score = 0
-        self.pole_top = 50  # Top of the pole position
-        self.pole_bottom = SCREEN_HEIGHT - 50  # Bottom of the pole position
-        self.pole_height = self.pole_bottom - self.pole_top
-        
-        # Climber properties
-        self.climber_x = SCREEN_WIDTH // 2 - CLIMBER_WIDTH // 2
-        self.climber_y = SCREEN_HEIGHT - CLIMBER_HEIGHT - 50
-        self.is_slipping = False
-        self.slip_timer = 0
-        self.balance_key_needed = None
-        self.coconuts = []
-        self.coconut_timer = 0
+        self.sim.reset()
+        self.particles.clear()
+        self.pressed_keys = 0
+        self.prev_climber_y = self.sim.climber_y
+        self.coconuts_moved = False
 
     def handle_events(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
+                self.quit()
                 
             if event.type == pygame.KEYDOWN:
-                if self.game_over or self.win:
-                    if event.key == pygame.K_r:
-                        self.reset_game()
-                else:
-                    # Balance mechanic
-                    if self.is_slipping:
-                        if (self.balance_key_needed == 'A' and event.key == pygame.K_a) or \
-                           (self.balance_key_needed == 'D' and event.key == pygame.K_d):
-                            self.is_slipping = False
-                            self.balance_key_needed = None
-                            if self.slip_sound:
-                                try:
-                                    self.slip_sound.play()
-                                except:
-                                    pass
+                # Presses are handed to the simulation on the next update
+                if event.key == pygame.K_r:
+                    self.pressed_keys |= KEY_R
+                elif event.key == pygame.K_a:
+                    self.pressed_keys |= KEY_A
+                elif event.key == pygame.K_d:
+                    self.pressed_keys |= KEY_D
+                elif event.key == pygame.K_F3:
+                    self.toggle_profiler()
+                elif event.key == pygame.K_F4:
+                    self.dump_trace()
 
-    def update(self):
-        if self.game_over or self.win:
+    def toggle_profiler(self):
+        if self.profiler is None:
+            self.profiler = Profiler()
+        self.show_profiler = not self.show_profiler
+        # The overlay leaves or covers regions outside the dirty rects
+        self.full_redraw = True
+
+    def dump_trace(self):
+        if self.profiler is None:
+            print("Profiler is off; press F3 to start it")
             return
-            
-        keys = pygame.key.get_pressed()
-        
-        # Climbing mechanic
-        if keys[pygame.K_UP] and not self.is_slipping:
-            self.climber_y -= CLIMB_SPEED
-            if self.climb_sound:
-                # Only play occasionally to avoid sound spam
-                if random.random() < 0.05:
-                    try:
-                        self.climb_sound.play()
-                    except:
-                        pass
-        
-        # Random slipping mechanic
-        if not self.is_slipping and random.random() < 0.01:
-            self.is_slipping = True
-            self.balance_key_needed = random.choice(['A', 'D'])
-            if self.slip_sound:
-                try:
-                    self.slip_sound.play()
-                except:
-                    pass
-        
-        # Handle slipping
-        if self.is_slipping:
-            self.slip_timer += 1
-            self.climber_y += SLIP_SPEED
-            
-            # If player doesn't balance in time, they fall
-            if self.slip_timer > 60:  # 1 second at 60 FPS
-                self.climber_y += FALL_SPEED
-                if self.fall_sound and random.random() < 0.1:
-                    try:
-                        self.fall_sound.play()
-                    except:
-                        pass
-                
-                # Reset slip state after falling for a bit
-                if self.slip_timer > 90:
-                    self.is_slipping = False
-                    self.balance_key_needed = None
-                    self.slip_timer = 0
+        path = time.strftime("trace-%Y%m%d-%H%M%S.json")
+        self.profiler.dump_trace(path, TRACE_SECONDS)
+        print(f"Wrote the last {TRACE_SECONDS}s of frame timings to {path}")
+
+    def quit(self):
+        print(f"Average render rate: {self.clock.get_fps():.1f} FPS")
+        stats = self.text_cache.stats()
+        print(f"Text cache: {stats['hits']} hits, {stats['misses']} misses "
+              f"({stats['hit_rate']:.1%} hit rate)")
+        stats = self.chunks.stats()
+        print(f"Scene chunks: {stats['misses']} painted, {stats['evictions']} evicted, "
+              f"{stats['size']} held")
+        stats = self.sounds.stats()
+        print(f"Sound: {stats['played']} voices played, {stats['dropped']} dropped "
+              f"({stats['dropped_cooldown']} cooldown, {stats['dropped_busy']} busy, "
+              f"{stats['dropped_polyphony']} polyphony), {stats['merged']} merged")
+        if self.capture is not None:
+            try:
+                self.capture.flush(self.screen)
+            except (OSError, ValueError) as e:
+                print(f"Could not write the last frames: {e}")
+            stats = self.capture.close()
+            print(f"Captured {stats['written']} frames to {self.capture_path}, "
+                  f"{stats['dropped']} dropped and filled by repeating the next frame")
+        if self.input_log is not None:
+            self.input_log.save(self.record_path, self.sim.state_hash())
+            print(f"Saved {len(self.input_log)} steps of input (seed {self.seed}) to {self.record_path}")
+        pygame.quit()
+        sys.exit()
+
+    def held_keys(self):
+        """Bitmask of the keys currently held down"""
+        return KEY_UP if pygame.key.get_pressed()[pygame.K_UP] else 0
+
+    def update(self):
+        keys = self.pressed_keys | self.held_keys()
+        self.pressed_keys = 0
         
-        # Spawn coconuts
-        self.coconut_timer += 1
-        if self.coconut_timer >= COCONUT_SPAWN_RATE:
-            self.coconut_timer = 0
-            if random.random() < 0.5:  # 50% chance to spawn a coconut
-                coconut_x = random.randint(0, SCREEN_WIDTH)
-                self.coconuts.append([coconut_x, 0])
+        if self.input_log is not None:
+            self.input_log.record(keys)
         
-        # Update coconuts
-        for coconut in self.coconuts[:]:
-            coconut[1] += COCONUT_SPEED
-            
-            # Check for collision with climber
-            if (self.climber_x < coconut[0] < self.climber_x + CLIMBER_WIDTH and
-                self.climber_y < coconut[1] < self.climber_y + CLIMBER_HEIGHT):
-                self.coconuts.remove(coconut)
-                self.climber_y += FALL_SPEED * 5  # Fall a significant amount
-                if self.hit_sound:
-                    try:
-                        self.hit_sound.play()
-                    except:
-                        pass
-            
-            # Remove coconuts that go off screen
-            if coconut[1] > SCREEN_HEIGHT:
-                self.coconuts.remove(coconut)
+        # Remember where the climber was so drawing can interpolate. Coconuts
+        # only fall on steps taken while the game is running.
+        self.prev_climber_y = self.sim.climber_y
+        sim = self.sim
+        self.coconuts_moved = not (sim.game_over or sim.win)
+        for event in sim.step(keys):
+            if event == EVENT_RESET:
+                self.prev_climber_y = sim.climber_y
+                self.coconuts_moved = True
+                self.particles.clear()
+            elif event == EVENT_HIT:
+                self.particles.burst(sim.climber_x + CLIMBER_WIDTH // 2, sim.climber_y, HIT_PARTICLES,
+                                     PARTICLE_SPEED, PARTICLE_LIFE)
+            self.play_event_sound(event)
+        update_particles(self.particles)
+        if self.profiler:
+            self.profiler.lap(PHASE_UPDATE)
+
+    def play_event_sound(self, event):
+        """Queue the event's sound effect, if it has one, for the next flush"""
+        effect = EVENT_EFFECTS.get(event)
+        if effect:
+            self.sounds.request(effect)
+
+    def build_atlas(self):
+        """Pack the sprites, or their fallback shapes, into one atlas surface"""
+        radius = COCONUT_SIZE // 2
+        atlas = SpriteAtlas()
+        atlas.add('pole', self.pole_img or rect_sprite((POLE_WIDTH, SCREEN_HEIGHT), BROWN))
+        atlas.add('climber', self.climber_img or rect_sprite((CLIMBER_WIDTH, CLIMBER_HEIGHT), GREEN))
+        if self.coconut_img:
+            atlas.add('coconut', self.coconut_img)
+        else:
+            # The fallback circle is positioned by its centre
+            atlas.add('coconut', circle_sprite(radius, BROWN), (-radius, -radius))
+        half = PARTICLE_SIZE // 2
+        atlas.add('particle', rect_sprite((PARTICLE_SIZE, PARTICLE_SIZE), BROWN), (-half, -half))
+        atlas.build()
+        self.atlas = atlas
+        # Reused every frame as the Surface.blits argument: [source, dest, area]
+        self.sprite_batch = []
+
+    def build_scene(self):
+        """Set up the background and pole chunks and the layer the view is drawn on"""
+        self.build_atlas()
         
-        # Keep climber on the pole
-        pole_center = SCREEN_WIDTH // 2
-        self.climber_x = pole_center - CLIMBER_WIDTH // 2
+        # Only the chunks around the view are painted and kept, so a pole many
+        # screens tall costs no more memory than a short one
+        chunk_count = self.sim.world_height // CHUNK_HEIGHT
+        self.chunks = ChunkCache((SCREEN_WIDTH, CHUNK_HEIGHT), chunk_count, self.render_chunk)
         
-        # Constrain climber to pole
-        if self.climber_y < self.pole_top:
-            self.climber_y = self.pole_top
-            self.win = True
-            if self.win_sound:
-                try:
-                    self.win_sound.play()
-                except:
-                    pass
-        elif self.climber_y > self.pole_bottom - CLIMBER_HEIGHT:
-            self.climber_y = self.pole_bottom - CLIMBER_HEIGHT
-            self.game_over = True
+        # The static layer for the view at scene_top. While the view scrolls
+        # the chunks are drawn straight to the screen instead.
+        self.scene = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
+        self.scene_top = None
+        self.camera_y = None
         
-        # Update score based on height climbed
-        self.score = int((self.pole_bottom - self.climber_y - CLIMBER_HEIGHT) / self.pole_height * 100)
+        # Semi-transparent black layer for the end screens
+        self.overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
+        self.overlay.fill((0, 0, 0, 128))
 
-    def draw(self):
+    def render_chunk(self, index, surface):
+        """Paint chunk index of the background and pole onto surface"""
+        # The one-screen images repeat up the pole, lined up with its bottom
+        y = index * CHUNK_HEIGHT % SCREEN_HEIGHT
+        
         # Draw background
         if self.background:
-            self.screen.blit(self.background, (0, 0))
+            surface.fill(BLACK)
+            surface.blit(self.background, (0, 0), (0, y, SCREEN_WIDTH, CHUNK_HEIGHT))
         else:
-            self.screen.fill(BLUE)  # Sky blue background
+            surface.fill(BLUE)  # Sky blue background
         
         # Draw pole
         pole_x = SCREEN_WIDTH // 2 - POLE_WIDTH // 2
-        if self.pole_img:
-            self.screen.blit(self.pole_img, (pole_x, 0))
-        else:
-            pygame.draw.rect(self.screen, BROWN, (pole_x, 0, POLE_WIDTH, SCREEN_HEIGHT))
-        
-        # Draw climber
-        if self.climber_img:
-            self.screen.blit(self.climber_img, (self.climber_x, self.climber_y))
-        else:
-            pygame.draw.rect(self.screen, GREEN, (self.climber_x, self.climber_y, CLIMBER_WIDTH, CLIMBER_HEIGHT))
+        pole = self.atlas.rects['pole']
+        surface.blit(self.atlas.surface, (pole_x, 0), (pole.x, pole.y + y, pole.width, CHUNK_HEIGHT))
+
+    def climber_draw_y(self, alpha):
+        """Climber's world y interpolated between the last two steps"""
+        return round(self.prev_climber_y + (self.sim.climber_y - self.prev_climber_y) * alpha)
+
+    def draw(self, alpha=1.0):
+        """
+        Draw the current frame
+
+        Args:
+            alpha: How far the render time is between the previous simulation
+                step (0) and the current one (1); moving sprites are
+                interpolated between the two.
+        """
+        sim = self.sim
+        overlay = sim.game_over or sim.win
         
-        # Draw coconuts
-        for coconut in self.coconuts:
-            if self.coconut_img:
-                self.screen.blit(self.coconut_img, (coconut[0], coconut[1]))
-            else:
-                pygame.draw.circle(self.screen, BROWN, (coconut[0], coconut[1]), COCONUT_SIZE // 2)
+        # The view follows the climber; when it scrolls, everything moves
+        camera_y = view_top(self.climber_draw_y(alpha), sim.world_height)
+        scrolled = camera_y != self.camera_y
+        self.camera_y = camera_y
+        if not scrolled and self.scene_top != camera_y:
+            self.chunks.draw(self.scene, camera_y)
+            self.scene_top = camera_y
+        full = not self.dirty_rects or self.full_redraw or overlay or scrolled
         
-        # Draw score
-        score_text = self.font.render(f"Height: {self.score}%", True, WHITE)
-        self.screen.blit(score_text, (10, 10))
+        # Restore the static layer, either everywhere or only where sprites were
+        if scrolled:
+            self.chunks.draw(self.screen, camera_y)
+        elif full:
+            self.screen.blit(self.scene, (0, 0))
+        else:
+            for rect in self.drawn_rects:
+                self.screen.blit(self.scene, rect, rect)
         
-        # Draw balance prompt if slipping
-        if self.is_slipping:
-            balance_text = self.font.render(f"Press '{self.balance_key_needed}' to balance!", True, RED)
-            self.screen.blit(balance_text, (SCREEN_WIDTH // 2 - balance_text.get_width() // 2, 50))
+        rects = self.draw_sprites(alpha, camera_y)
         
         # Draw game over or win screen
-        if self.game_over:
+        if sim.game_over:
             self.draw_message("Game Over! Press 'R' to restart", RED)
-        elif self.win:
+        elif sim.win:
             self.draw_message("You Win! Press 'R' to play again", GREEN)
         
-        pygame.display.flip()
+        profiler = self.profiler
+        if profiler:
+            if self.show_profiler:
+                if self.profiler_font is None:
+                    self.profiler_font = pygame.font.Font(None, 18)
+                rects.append(draw_overlay(self.screen, self.profiler_font, profiler, len(sim.coconuts)))
+            profiler.lap(PHASE_DRAW)
+        
+        if self.present:
+            if full:
+                pygame.display.flip()
+            else:
+                pygame.display.update(self.drawn_rects + rects)
+        if profiler:
+            profiler.lap(PHASE_PRESENT)
+        # The overlay covers the whole screen, so the frame after it is full
+        self.full_redraw = overlay
+        self.drawn_rects = rects
+
+    def capture_frame(self, steps):
+        """
+        Hand the frame to the capture writer once for each of the steps it
+        shows, stopping the capture if writing fails
+        """
+        try:
+            self.capture.submit(self.screen, repeat=steps)
+        except (OSError, ValueError) as e:
+            print(f"Stopped capturing frames: {e}")
+            self.capture.close()
+            self.capture = None
+
+    def draw_sprites(self, alpha=1.0, camera_y=0):
+        """Draw the climber, coconuts and HUD in one batch and return the rects they cover"""
+        sim = self.sim
+        atlas = self.atlas
+        batch = self.sprite_batch
+        particles = self.particles
+        count = len(sim.coconuts) + len(particles)
+        while len(batch) < count + 3:
+            batch.append([None, pygame.Rect(0, 0, 0, 0), None])
+        
+        # Climber
+        offset_x, offset_y = atlas.offsets['climber']
+        item = batch[0]
+        item[0] = atlas.sprites['climber']
+        item[1].topleft = (sim.climber_x + offset_x, self.climber_draw_y(alpha) - camera_y + offset_y)
+        item[2] = None
+        
+        # Coconuts, which all fall at the same speed. The simulation only keeps
+        # the ones near the view; blits clips any that are partly off screen.
+        coconut_x, coconut_y = sim.coconuts.positions()
+        lag = round(sim.coconut_speed * (1.0 - alpha)) if self.coconuts_moved else 0
+        offset_x, offset_y = atlas.offsets['coconut']
+        source = atlas.sprites['coconut']
+        xs = (coconut_x + offset_x).tolist()
+        ys = (coconut_y + (offset_y - lag - camera_y)).tolist()
+        for item, x, y in zip(itertools.islice(batch, 1, None), xs, ys):
+            item[0] = source
+            dest = item[1]
+            dest.x = x
+            dest.y = y
+            item[2] = None
+        n = len(sim.coconuts) + 1
+        
+        # Particles, stepped back along their velocity for interpolation
+        m = len(particles)
+        if m:
+            back = 1.0 - alpha
+            offset_x, offset_y = atlas.offsets['particle']
+            source = atlas.sprites['particle']
+            xs = (particles.x[:m] - particles.vx[:m] * back + offset_x).tolist()
+            ys = (particles.y[:m] - particles.vy[:m] * back + (offset_y - camera_y)).tolist()
+            for item, x, y in zip(itertools.islice(batch, n, None), xs, ys):
+                item[0] = source
+                dest = item[1]
+                dest.x = x
+                dest.y = y
+                item[2] = None
+            n += m
+        
+        # Score
+        item = batch[n]
+        item[0] = self.text_cache.render(self.font, f"Height: {sim.score}%", WHITE)
+        item[1].topleft = (10, 10)
+        item[2] = None
+        n += 1
+        
+        # Balance prompt if slipping
+        if sim.is_slipping:
+            balance_text = self.text_cache.render(self.font, f"Press '{sim.balance_key_needed}' to balance!", RED)
+            item = batch[n]
+            item[0] = balance_text
+            item[1].topleft = (SCREEN_WIDTH // 2 - balance_text.get_width() // 2, 50)
+            item[2] = None
+            n += 1
+        
+        return self.screen.blits(itertools.islice(batch, n))
 
     def draw_message(self, message, color):
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0, 0, 0, 128))  # Semi-transparent black
-        self.screen.blit(overlay, (0, 0))
+        self.screen.blit(self.overlay, (0, 0))
         
-        text = self.font.render(message, True, color)
+        text = self.text_cache.render(self.font, message, color)
         text_rect = text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2))
         self.screen.blit(text, text_rect)
 
     def run(self):
+        # Fixed-timestep loop: the simulation advances in STEP_TIME increments
+        # however often frames are rendered, and drawing interpolates between
+        # the last two steps.
+        accumulator = 0.0
+        previous = time.perf_counter()
         while True:
+            now = time.perf_counter()
+            accumulator += now - previous
+            previous = now
+            
             self.handle_events()
-            self.update()
-            self.draw()
-            self.clock.tick(60)
+            if self.profiler:
+                self.profiler.lap(PHASE_EVENTS)
+            steps = 0
+            while accumulator >= STEP_TIME and steps < MAX_CATCH_UP_STEPS:
+                self.update()
+                accumulator -= STEP_TIME
+                steps += 1
+            if accumulator >= STEP_TIME:
+                # Too far behind to catch up; slow down rather than spiral
+                accumulator = STEP_TIME * 0.999
+            
+            # Sounds queued by this frame's steps start together
+            self.sounds.flush()
+            if self.profiler:
+                self.profiler.lap(PHASE_SOUND)
+            
+            self.draw(accumulator / STEP_TIME)
+            if not self.first_frame_shown:
+                self.first_frame_shown = True
+                startup.mark('first frame')
+                # The window is up; only now pay for the mixer and the sounds
+                if not self.audio_started:
+                    self.start_audio()
+                # Everything loaded so far lives for the whole session; keep
+                # the collector from rescanning it while the game runs
+                gc.collect()
+                gc.freeze()
+                if self.profile_startup:
+                    startup.report('first frame')
+            if self.capture is not None:
+                self.capture_frame(steps)
+            self.clock.tick(0 if self.uncapped else self.fps)
+            if self.profiler:
+                self.profiler.lap(PHASE_WAIT)
+                self.profiler.end_frame()
 
-if __name__ == "__main__":
-    game = Game()
+def main():
+    parser = argparse.ArgumentParser(description="Lissana Gaha Nagima")
+    parser.add_argument('--dirty-rects', action='store_true',
+                        help="only redraw and push the screen regions that change each frame")
+    parser.add_argument('--fps', type=int, default=60,
+                        help=f"render rate cap; the simulation always runs at {SIM_RATE} steps/s")
+    parser.add_argument('--uncapped', action='store_true',
+                        help="render as fast as possible (for benchmarking)")
+    parser.add_argument('--seed', type=int, help="seed for the game's random number generator")
+    parser.add_argument('--record', metavar='PATH',
+                        help="save the session's inputs to PATH for replay with input_log.py")
+    parser.add_argument('--profile', action='store_true',
+                        help="start with the profiler overlay on (F3 toggles it, F4 dumps a trace)")
+    parser.add_argument('--pole-screens', type=int, default=1, metavar='N',
+                        help="make the pole N screens tall; the view scrolls to follow the climber")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="print where the time went from import to the first frame")
+    parser.add_argument('--capture', metavar='PATH',
+                        help=f"stream one frame per simulation step ({SIM_RATE} fps) to PATH: "
+                             "raw if it ends in .raw, else through ffmpeg")
+    args = parser.parse_args()
+    if args.pole_screens < 1:
+        parser.error("--pole-screens must be at least 1")
+    # The input log's header limits these; checked now, not when --record saves after the session
+    if args.pole_screens > MAX_POLE_SCREENS:
+        parser.error(f"--pole-screens can be at most {MAX_POLE_SCREENS}")
+    if args.seed is not None and not 0 <= args.seed <= MAX_SEED:
+        parser.error(f"--seed must be between 0 and {MAX_SEED}")
+    
+    try:
+        game = Game(dirty_rects=args.dirty_rects, fps=args.fps, uncapped=args.uncapped,
+                    seed=args.seed, record=args.record, profile=args.profile,
+                    pole_screens=args.pole_screens, defer_audio=True,
+                    profile_startup=args.profile_startup, capture=args.capture)
+    except OSError as e:
+        # e.g. --capture to a video file without ffmpeg installed
+        parser.error(str(e))
     game.run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Voice-managed sound playback for Lissana Gaha Nagima.
+
+Game code calls SoundDispatcher.request(name) whenever something should make
+a noise; requests are only queued. flush() runs once per frame and decides
+which of them become voices:
+
+- repeated requests for the same effect within a frame are merged,
+- an effect is dropped if it played less than its cooldown ago,
+- each effect plays on a reserved group of mixer channels and is dropped
+  when every channel in its group is busy,
+- nothing new starts once max_voices channels are playing.
+
+Reserved channels are never handed out by Sound.play(), so effects in one
+group cannot cut off effects in another.
+"""
+import pygame
+
+
+class SoundDispatcher:
+    """Queues sound requests and plays them on reserved channel groups"""
+
+    def __init__(self, groups, max_voices=None, clock=pygame.time.get_ticks):
+        """
+        Args:
+            groups: Dict of group name to number of channels reserved for it
+            max_voices: Cap on channels playing at once (default: all reserved)
+            clock: Returns the current time in milliseconds
+        """
+        self.clock = clock
+        self.enabled = bool(pygame.mixer.get_init())
+        self.groups = {}
+        self.channels = []
+        if self.enabled:
+            total = sum(groups.values())
+            if pygame.mixer.get_num_channels() < total:
+                pygame.mixer.set_num_channels(total)
+            pygame.mixer.set_reserved(total)
+            for name, count in groups.items():
+                channels = [pygame.mixer.Channel(len(self.channels) + i) for i in range(count)]
+                self.groups[name] = channels
+                self.channels.extend(channels)
+        self.max_voices = max_voices if max_voices is not None else len(self.channels)
+
+        self.effects = {}
+        self.pending = []
+        self.played = 0
+        self.merged = 0
+        self.dropped_cooldown = 0
+        self.dropped_busy = 0
+        self.dropped_polyphony = 0
+
+    def add(self, name, sound, group, cooldown_ms=0):
+        """Register sound as effect name; effects without a sound are ignored"""
+        if sound is None or not self.enabled:
+            return
+        # [sound, channels, cooldown, last played]
+        self.effects[name] = [sound, self.groups[group], cooldown_ms, None]
+
+    def request(self, name):
+        """Ask for effect name to be played at the next flush"""
+        if name in self.effects:
+            self.pending.append(name)
+
+    def flush(self):
+        """Start voices for the queued requests and clear the queue"""
+        pending = self.pending
+        if not pending:
+            return
+        self.pending = []
+        now = self.clock()
+        voices = sum(1 for channel in self.channels if channel.get_busy())
+        seen = set()
+        for name in pending:
+            if name in seen:
+                self.merged += 1
+                continue
+            seen.add(name)
+            effect = self.effects[name]
+            sound, channels, cooldown_ms, last = effect
+            if last is not None and now - last < cooldown_ms:
+                self.dropped_cooldown += 1
+                continue
+            if voices >= self.max_voices:
+                self.dropped_polyphony += 1
+                continue
+            for channel in channels:
+                if not channel.get_busy():
+                    channel.play(sound)
+                    effect[3] = now
+                    voices += 1
+                    self.played += 1
+                    break
+            else:
+                self.dropped_busy += 1
+
+    def stats(self):
+        dropped = self.dropped_cooldown + self.dropped_busy + self.dropped_polyphony
+        return {
+            'played': self.played,
+            'dropped': dropped,
+            'dropped_cooldown': self.dropped_cooldown,
+            'dropped_busy': self.dropped_busy,
+            'dropped_polyphony': self.dropped_polyphony,
+            'merged': self.merged,
+        }
@@ -0,0 +1,84 @@
+"""
+Sprite atlas for Lissana Gaha Nagima.
+
+All sprites, including the coloured shapes drawn when an image is missing,
+are packed into one surface at load time. Drawing a sprite is then a blit of
+a region of that surface, so a whole frame of sprites can go to the screen
+in a single Surface.blits call.
+
+SDL blits a small region of a wide surface noticeably slower than a surface
+of the same size, so build() also cuts each region out into its own compact
+surface. Per-frame batches use those; the atlas itself serves static layers.
+"""
+import pygame
+
+
+def rect_sprite(size, color):
+    """Filled rectangle, the fallback for missing pole and climber images"""
+    surface = pygame.Surface(size, pygame.SRCALPHA)
+    surface.fill(color)
+    return surface
+
+
+def circle_sprite(radius, color):
+    """Filled circle centred in a 2 * radius square, the fallback for coconuts"""
+    surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+    pygame.draw.circle(surface, color, (radius, radius), radius)
+    return surface
+
+
+class SpriteAtlas:
+    """Packs named sprites into rows of one surface"""
+
+    def __init__(self, max_width=1024, padding=1):
+        self.max_width = max_width
+        self.padding = padding
+        self.pending = {}
+        self.surface = None
+        self.rects = {}
+        self.offsets = {}
+        self.sprites = {}
+
+    def add(self, name, surface, offset=(0, 0)):
+        """
+        Add a sprite to pack on the next build
+
+        Args:
+            name: Name to look the sprite up by
+            surface: Image of the sprite
+            offset: Added to the draw position, e.g. (-r, -r) for a circle
+                of radius r that is positioned by its centre
+        """
+        self.pending[name] = (surface, offset)
+
+    def build(self):
+        """Pack every added sprite, tallest first, and return the atlas surface"""
+        pad = self.padding
+        order = sorted(self.pending, key=lambda name: -self.pending[name][0].get_height())
+        positions = {}
+        x = y = row_height = width = 0
+        for name in order:
+            w, h = self.pending[name][0].get_size()
+            if x and x + w > self.max_width:
+                x = 0
+                y += row_height + pad
+                row_height = 0
+            positions[name] = (x, y)
+            x += w + pad
+            width = max(width, x)
+            row_height = max(row_height, h)
+
+        self.surface = pygame.Surface((max(width, 1), max(y + row_height, 1)), pygame.SRCALPHA)
+        if pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert_alpha()
+        self.surface.fill((0, 0, 0, 0))
+        self.rects = {}
+        self.offsets = {}
+        self.sprites = {}
+        for name, (surface, offset) in self.pending.items():
+            # MAX onto the cleared atlas copies colour and alpha unchanged
+            self.surface.blit(surface, positions[name], special_flags=pygame.BLEND_RGBA_MAX)
+            self.rects[name] = pygame.Rect(positions[name], surface.get_size())
+            self.offsets[name] = offset
+            self.sprites[name] = self.surface.subsurface(self.rects[name]).copy()
+        return self.surface
@@ -0,0 +1,47 @@
+"""
+Startup timing for Lissana Gaha Nagima.
+
+The clock starts when this module is first imported, so the game imports it
+before anything else. Each mark() records the time since the previous mark
+under a label; report() prints the breakdown for --profile-startup. Only the
+standard library is used so importing it costs nothing measurable.
+"""
+import time
+
+
+class StartupTimer:
+    """Labelled intervals from process import to the first frame and beyond"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.last = self.start
+        self.marks = []
+
+    def mark(self, label):
+        """Record the time since the previous mark as label"""
+        now = time.perf_counter()
+        self.marks.append((label, now - self.last))
+        self.last = now
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def report(self, first_frame_label):
+        """
+        Print each interval, with a subtotal at the mark named first_frame_label
+
+        Marks after it are work the game deferred until the window was up.
+        """
+        total = sum(seconds for _, seconds in self.marks)
+        print(f"{'startup step':<32}{'ms':>9}{'share':>8}")
+        running = 0.0
+        for label, seconds in self.marks:
+            running += seconds
+            share = seconds / total if total else 0.0
+            print(f"{label:<32}{seconds * 1000:>9.1f}{share:>8.1%}")
+            if label == first_frame_label:
+                print(f"{'= import to first frame':<32}{running * 1000:>9.1f}")
+        print(f"{'= total':<32}{total * 1000:>9.1f}")
+
+
+timer = StartupTimer()
@@ -0,0 +1,243 @@
+"""
+Difficulty parameter sweep for Lissana Gaha Nagima.
+
+Plays a batch of headless games with a scripted player for every point of a
+grid of difficulty parameters, spread over a process pool, and reports the
+win rate, time to reach the top and coconut hits per game at each point:
+
+    python sweep.py --climb-speed 1:3 --coconut-spawn-rate 30:90:15 --policy human
+
+Parameters not given keep their default from pole_sim.DEFAULT_PARAMS. Ranges
+are start:stop[:step], inclusive, or lists of values.
+
+Each point's result is cached under sweep_cache/ by its parameters, seed,
+policy, game count and a hash of the simulation code, so repeating or
+extending a sweep only plays the new points.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from pole_batch import BatchSim
+from pole_sim import DEFAULT_PARAMS, KEY_UP, difficulty
+
+SWEEP_VERSION = 1
+CACHE_DIRNAME = 'sweep_cache'
+SIM_RATE = 60  # steps per second, for reporting times
+MAX_SECONDS = 120  # games still running after this long count as timeouts
+
+# Scripted players: frames between a slip starting and pressing the balance key
+POLICIES = {
+    'perfect': 0,
+    'human': 20,
+    'slow': 45,
+    'never': None,
+}
+
+
+def policy_delay(policy):
+    """Reaction delay in frames for a policy name, or 'reaction:N' for N frames"""
+    if policy in POLICIES:
+        return POLICIES[policy]
+    name, _, frames = policy.partition(':')
+    if name == 'reaction' and frames.isdigit():
+        return int(frames)
+    raise ValueError(f"Unknown policy {policy!r}; use one of {', '.join(POLICIES)} or reaction:N")
+
+
+def play(params, seed, policy, games, max_steps=MAX_SECONDS * SIM_RATE):
+    """
+    Play a batch of games holding UP and balancing after the policy's delay
+
+    Returns:
+        Dict of results for the grid point
+    """
+    delay = policy_delay(policy)
+    batch = BatchSim(games, seed, params=params)
+    steps = 0
+    while steps < max_steps and not (batch.win | batch.game_over).all():
+        keys = np.full(games, KEY_UP, dtype=np.uint8)
+        if delay is not None:
+            keys |= np.where(batch.slip_timer >= delay, batch.balance_key_needed, 0).astype(np.uint8)
+        batch.step(keys)
+        steps += 1
+
+    wins = batch.win
+    seconds_to_top = batch.frames[wins] / SIM_RATE
+    if len(seconds_to_top):
+        p10, p50, p90 = np.percentile(seconds_to_top, [10, 50, 90])
+        time_to_top = {'p10': round(float(p10), 2), 'p50': round(float(p50), 2),
+                       'p90': round(float(p90), 2), 'mean': round(float(seconds_to_top.mean()), 2)}
+    else:
+        time_to_top = None
+    return {
+        'games': games,
+        'win_rate': round(float(wins.mean()), 4),
+        'loss_rate': round(float(batch.game_over.mean()), 4),
+        'timeout_rate': round(float((~(wins | batch.game_over)).mean()), 4),
+        'time_to_top_s': time_to_top,
+        'hits_per_game': round(float(batch.hits.mean()), 3),
+        'slips_per_game': round(float(batch.slips.mean()), 3),
+    }
+
+
+def rules_hash():
+    """Hash of the simulation code, so cached results go stale when the rules change"""
+    digest = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in ('pole_sim.py', 'pole_batch.py'):
+        with open(os.path.join(here, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def point_key(params, seed, policy, games, rules):
+    key = json.dumps({'params': params, 'seed': seed, 'policy': policy, 'games': games,
+                      'rules': rules, 'version': SWEEP_VERSION}, sort_keys=True)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _play_point(task):
+    params, seed, policy, games = task
+    start = time.perf_counter()
+    result = play(params, seed, policy, games)
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return task, result
+
+
+def sweep(points, seed=0, policy='human', games=1000, jobs=1, cache_dir=None, force=False):
+    """
+    Play every grid point that is not already cached
+
+    Args:
+        points: List of full parameter dicts
+        cache_dir: Directory for cached results, or None to disable caching
+        force: Replay points even if they are cached
+
+    Returns:
+        (results, computed) where results lines up with points
+    """
+    rules = rules_hash()
+    results = [None] * len(points)
+    pending = []
+    for i, params in enumerate(points):
+        path = os.path.join(cache_dir, point_key(params, seed, policy, games, rules) + '.json') if cache_dir else None
+        if path and not force and os.path.exists(path):
+            with open(path) as f:
+                results[i] = json.load(f)
+        else:
+            pending.append((i, path))
+
+    tasks = [(points[i], seed, policy, games) for i, _ in pending]
+    if jobs > 1 and len(tasks) > 1:
+        with Pool(min(jobs, len(tasks))) as pool:
+            played = pool.map(_play_point, tasks)
+    else:
+        played = [_play_point(task) for task in tasks]
+
+    if cache_dir and pending:
+        os.makedirs(cache_dir, exist_ok=True)
+    for (i, path), (_, result) in zip(pending, played):
+        results[i] = result
+        if path:
+            with open(path, 'w') as f:
+                json.dump(result, f)
+    return results, len(pending)
+
+
+def parse_values(tokens):
+    """Expand ['1:3', '5'] into [1, 2, 3, 5]; raises ValueError for malformed tokens"""
+    values = []
+    for token in tokens:
+        try:
+            parts = [int(part) for part in token.split(':')]
+        except ValueError:
+            raise ValueError(f"{token!r} is not a value or start:stop[:step]") from None
+        if len(parts) == 1:
+            values.append(parts[0])
+            continue
+        if len(parts) > 3:
+            raise ValueError(f"{token!r} is not a value or start:stop[:step]")
+        start, stop = parts[0], parts[1]
+        step = parts[2] if len(parts) > 2 else 1
+        if step < 1:
+            raise ValueError(f"step in {token!r} must be at least 1")
+        if stop < start:
+            raise ValueError(f"range {token!r} is empty")
+        values.extend(range(start, stop + 1, step))
+    return values
+
+
+def grid(ranges):
+    """Every combination of the given parameter values, defaults elsewhere"""
+    names = list(ranges)
+    return [{**DEFAULT_PARAMS, **dict(zip(names, combo))}
+            for combo in itertools.product(*(ranges[name] for name in names))]
+
+
+def print_table(points, results, varied):
+    header = ''.join(f"{name:>20}" for name in varied)
+    print(f"{header}{'win':>8}{'lose':>8}{'top p50 s':>11}{'top p90 s':>11}{'hits':>7}")
+    for params, result in zip(points, results):
+        row = ''.join(f"{params[name]:>20}" for name in varied)
+        top = result['time_to_top_s']
+        p50 = f"{top['p50']:.1f}" if top else '-'
+        p90 = f"{top['p90']:.1f}" if top else '-'
+        print(f"{row}{result['win_rate']:>8.1%}{result['loss_rate']:>8.1%}{p50:>11}{p90:>11}"
+              f"{result['hits_per_game']:>7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep difficulty parameters with a scripted player")
+    for name in DEFAULT_PARAMS:
+        parser.add_argument('--' + name.replace('_', '-'), nargs='+', metavar='VALUES',
+                            help=f"values or start:stop[:step] (default: {DEFAULT_PARAMS[name]})")
+    parser.add_argument('--policy', default='human',
+                        help=f"scripted player: {', '.join(POLICIES)} or reaction:N (default: human)")
+    parser.add_argument('--games', type=int, default=1000, help="games per grid point")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the games")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help="number of worker processes")
+    parser.add_argument('--force', action='store_true', help="replay points even if they are cached")
+    parser.add_argument('--no-cache', action='store_true', help="neither read nor write cached results")
+    parser.add_argument('--json', metavar='PATH', help="write the results as JSON")
+    args = parser.parse_args()
+
+    try:
+        policy_delay(args.policy)
+    except ValueError as e:
+        parser.error(str(e))
+    ranges = {}
+    for name in DEFAULT_PARAMS:
+        if getattr(args, name):
+            try:
+                ranges[name] = parse_values(getattr(args, name))
+                for value in ranges[name]:
+                    difficulty({name: value})
+            except ValueError as e:
+                parser.error(f"--{name.replace('_', '-')}: {e}")
+    points = grid(ranges)
+    cache_dir = None if args.no_cache else os.path.join(os.path.dirname(os.path.abspath(__file__)), CACHE_DIRNAME)
+
+    start = time.perf_counter()
+    results, computed = sweep(points, args.seed, args.policy, args.games, args.jobs, cache_dir, args.force)
+    elapsed = time.perf_counter() - start
+
+    print_table(points, results, list(ranges) or ['climb_speed'])
+    print(f"{len(points)} points ({computed} played, {len(points) - computed} cached), "
+          f"{args.games} games each, policy {args.policy}, in {elapsed:.2f}s")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'policy': args.policy, 'seed': args.seed, 'games': args.games,
+                       'points': [{'params': p, **r} for p, r in zip(points, results)]}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
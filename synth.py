@@ -0,0 +1,197 @@
+"""
+Procedural sound synthesis for Lissana Gaha Nagima.
+
+Sounds are described by declarative specs: a duration, a list of layers that
+are summed, and an optional envelope applied to the sum. For example:
+
+    {
+        'duration_ms': 50,
+        'layers': [
+            {'type': 'sine', 'freq': 440, 'volume': 0.3},
+            {'type': 'noise', 'amount': 0.2, 'seed': 0},
+        ],
+        'envelope': {'type': 'linear', 'start': 0.5, 'end': 1.0},
+    }
+
+Layer types:
+    sine: freq, volume
+    stepped_chirp: start_freq, freq_step, steps, step_ms, tone_ms, volume
+    noise: amount, seed (uniform noise in [-amount, amount])
+
+Envelope types:
+    linear: start, end
+    exp: rate (multiplies by exp(-t) for t from 0 to rate)
+
+Synth renders specs to 16-bit PCM and memoizes the result by spec hash, in
+memory and optionally in a cache directory, so a sound is synthesized once
+and later loads just read its buffer.
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+
+# Bump whenever rendering changes so cached buffers are not reused
+SYNTH_VERSION = 1
+
+# Name of the cache directory inside the assets directory
+CACHE_DIRNAME = 'synth_cache'
+
+
+def create_sine_wave(frequency, duration_ms, volume=0.5, sample_rate=44100):
+    """
+    Create a sine wave with the given frequency and duration
+
+    Args:
+        frequency: Frequency in Hz
+        duration_ms: Duration in milliseconds
+        volume: Volume between 0 and 1
+        sample_rate: Sample rate in Hz
+
+    Returns:
+        Numpy array of audio samples
+    """
+    num_samples = int(duration_ms * sample_rate / 1000)
+    t = np.linspace(0, duration_ms / 1000, num_samples, endpoint=False)
+    wave_data = np.sin(2 * np.pi * frequency * t) * volume
+    return wave_data
+
+
+def create_stepped_chirp(start_freq, freq_step, steps, step_ms, tone_ms, duration_ms, volume=0.4, sample_rate=44100):
+    """
+    Create a sweep of overlapping short tones in one pass
+
+    Tone i starts at i * step_ms, lasts tone_ms and has frequency
+    start_freq + i * freq_step. Overlapping tones are summed.
+
+    Args:
+        start_freq: Frequency of the first tone in Hz
+        freq_step: Frequency change between consecutive tones in Hz
+        steps: Number of tones
+        step_ms: Time between tone starts in milliseconds
+        tone_ms: Length of each tone in milliseconds
+        duration_ms: Length of the output in milliseconds
+        volume: Volume of each tone between 0 and 1
+        sample_rate: Sample rate in Hz
+
+    Returns:
+        Numpy array of audio samples
+    """
+    num_samples = int(duration_ms * sample_rate / 1000)
+    index = np.arange(steps)
+    starts = (index * step_ms * sample_rate / 1000).astype(np.int64)
+    ends = np.minimum(((index + tone_ms / step_ms) * step_ms * sample_rate / 1000).astype(np.int64), num_samples)
+    lengths = np.maximum(ends - starts, 0)
+
+    # One entry per (tone, sample) pair, laid out tone by tone
+    tone = np.repeat(index, lengths)
+    offset = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    t = offset * ((tone_ms / 1000) / lengths[tone])
+    freq = start_freq + tone * freq_step
+    samples = np.sin(2 * np.pi * freq * t) * volume
+    return np.bincount(starts[tone] + offset, weights=samples, minlength=num_samples)
+
+
+def _render_layer(layer, duration_ms, num_samples, sample_rate):
+    kind = layer['type']
+    if kind == 'sine':
+        return create_sine_wave(layer['freq'], duration_ms, layer.get('volume', 0.5), sample_rate)
+    if kind == 'stepped_chirp':
+        return create_stepped_chirp(layer['start_freq'], layer['freq_step'], layer['steps'],
+                                    layer['step_ms'], layer['tone_ms'], duration_ms,
+                                    layer.get('volume', 0.4), sample_rate)
+    if kind == 'noise':
+        amount = layer['amount']
+        return np.random.default_rng(layer.get('seed', 0)).uniform(-amount, amount, num_samples)
+    raise ValueError(f"Unknown layer type: {kind}")
+
+
+def _envelope(envelope, num_samples):
+    kind = envelope['type']
+    if kind == 'linear':
+        return np.linspace(envelope['start'], envelope['end'], num_samples)
+    if kind == 'exp':
+        return np.exp(-np.linspace(0, envelope['rate'], num_samples))
+    raise ValueError(f"Unknown envelope type: {kind}")
+
+
+def render(spec, sample_rate=44100):
+    """Render a spec to a float array of samples between -1 and 1 (before clipping)"""
+    duration_ms = spec['duration_ms']
+    num_samples = int(duration_ms * sample_rate / 1000)
+    audio = np.zeros(num_samples)
+    for layer in spec['layers']:
+        audio += _render_layer(layer, duration_ms, num_samples, sample_rate)
+    if spec.get('envelope'):
+        audio = audio * _envelope(spec['envelope'], num_samples)
+    return audio
+
+
+def to_pcm16(audio, channels=1):
+    """Clip float samples and convert them to interleaved little-endian 16-bit PCM"""
+    pcm = (np.clip(audio, -1, 1) * 32767).astype('<i2')
+    if channels > 1:
+        pcm = np.repeat(pcm, channels)
+    return pcm.tobytes()
+
+
+def spec_hash(spec, sample_rate=44100, channels=1):
+    key = json.dumps({'spec': spec, 'sample_rate': sample_rate, 'channels': channels,
+                      'version': SYNTH_VERSION}, sort_keys=True)
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class Synth:
+    """Renders specs to PCM, memoized in memory and in an optional cache directory"""
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self.buffers = {}
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.renders = 0
+
+    def pcm(self, spec, sample_rate=44100, channels=1):
+        """Return the spec rendered as 16-bit PCM bytes"""
+        key = spec_hash(spec, sample_rate, channels)
+        buffer = self.buffers.get(key)
+        if buffer is not None:
+            self.memory_hits += 1
+            return buffer
+
+        path = os.path.join(self.cache_dir, key + '.pcm') if self.cache_dir else None
+        if path and os.path.exists(path):
+            with open(path, 'rb') as f:
+                buffer = f.read()
+            self.disk_hits += 1
+        else:
+            buffer = to_pcm16(render(spec, sample_rate), channels)
+            self.renders += 1
+            if path:
+                try:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    temp_path = path + '.tmp'
+                    with open(temp_path, 'wb') as f:
+                        f.write(buffer)
+                    os.replace(temp_path, path)
+                except OSError as e:
+                    print(f"Could not write synth cache: {e}")
+        self.buffers[key] = buffer
+        return buffer
+
+    def make_sound(self, spec):
+        """
+        Return a pygame Sound for the spec in the mixer's current format
+
+        Returns None if the mixer is not initialized or is not 16-bit.
+        """
+        import pygame
+        mixer_format = pygame.mixer.get_init()
+        if not mixer_format:
+            return None
+        frequency, size, channels = mixer_format
+        if size != -16:
+            print(f"Synth only renders 16-bit sound, mixer uses {size}")
+            return None
+        return pygame.mixer.Sound(buffer=self.pcm(spec, frequency, channels))